@@ -0,0 +1 @@
+"""Benchmarks manuais do backup_app (não fazem parte da suite de testes)."""
@@ -0,0 +1,65 @@
+"""Utilitários partilhados pelos benchmarks."""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Permite correr ``python benchmarks/bench_x.py`` a partir da raiz do projeto
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def make_tree(base: Path, n_files: int, per_dir: int = 200, size: int = 0, exts=("jpg", "txt")) -> Path:
+    """Cria uma árvore sintética com ``n_files`` ficheiros em pastas de ``per_dir``."""
+    base.mkdir(parents=True, exist_ok=True)
+    payload = os.urandom(size) if size else b""
+    for i in range(n_files):
+        d = base / f"d{i // per_dir:05d}" / f"s{(i // per_dir) % 7}"
+        if i % per_dir == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        (d / f"f{i:07d}.{exts[i % len(exts)]}").write_bytes(payload)
+    return base
+
+
+@contextmanager
+def timer(result: dict, key: str = "seconds"):
+    t0 = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result[key] = time.perf_counter() - t0
+
+
+@contextmanager
+def count_fs_calls(counter: dict):
+    """Conta chamadas ao SO feitas pelo Python (stat/lstat/listdir/scandir).
+
+    Não vê o ``stat`` interno de ``DirEntry.stat()`` nem o das camadas em C;
+    serve para comparar implementações, não para substituir ``strace -c``.
+    """
+    names = ("stat", "lstat", "listdir", "scandir")
+    originals = {n: getattr(os, n) for n in names}
+
+    def wrap(name, fn):
+        def inner(*a, **kw):
+            counter[name] = counter.get(name, 0) + 1
+            return fn(*a, **kw)
+        return inner
+
+    for n, fn in originals.items():
+        setattr(os, n, wrap(n, fn))
+    try:
+        yield counter
+    finally:
+        for n, fn in originals.items():
+            setattr(os, n, fn)
+
+
+def fmt_rate(n: int, seconds: float) -> str:
+    if seconds <= 0:
+        return "∞"
+    return f"{n / seconds:,.0f}/s"
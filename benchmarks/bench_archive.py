@@ -0,0 +1,178 @@
+"""Pico de memória (RSS) ao extrair membros de vários GB de um arquivo.
+
+Cria um zip com um membro grande (deflate de dados repetitivos: pequeno em
+disco, ``--size-gb`` depois de descomprimido) e mede, cada modo num processo
+novo, o tempo e o ``ru_maxrss``:
+
+- ``BytesIO (antigo)``: o membro inteiro em memória, como antes;
+- ``spooled``: ``iterate_archive`` por omissão (memória até ``SPOOL_MAX``,
+  o resto num temporário);
+- ``stream``: ``iterate_archive(..., stream=True)``;
+- ``copy_selected``: o caminho completo da cópia, até ao destino.
+
+Com ``--7z-files N`` mede antes a extração de um 7z sólido com ``N`` jpg
+(precisa de ``py7zr``): um ``read([nome])`` por membro, como antes, contra a
+passagem única de ``iterate_archive``.
+
+Com ``--rar A.rar B.rar`` mede membros/s em RARs existentes (sólidos ou não;
+precisa de ``rarfile`` e de ``unrar``, ``7z`` ou ``bsdtar``): um ``r.open``
+(um processo) por membro, como antes, contra a extração numa só chamada.
+Serve também de verificação manual com um RAR real: os membros e os bytes
+entregues pelos dois modos têm de coincidir.
+
+Uso: ``python benchmarks/bench_archive.py [--size-gb 2] [--7z-files 2000] [--rar x.rar] [--tmp /mnt/disco]``
+(o modo antigo precisa de ``--size-gb`` de RAM livre; ``--skip-old`` evita-o).
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from _common import ROOT, fmt_rate, timer
+
+from src.core.copier import copy_selected
+from src.core.extractor import iterate_archive
+
+MODES = ("BytesIO (antigo)", "spooled", "stream", "copy_selected")
+_CHUNK = 4 * 1024 * 1024
+
+
+def make_archive(path: Path, size: int) -> None:
+    block = (bytes(range(256)) * (_CHUNK // 256))
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        with z.open("filmes/grande.mkv", "w", force_zip64=True) as out:
+            left = size
+            while left > 0:
+                out.write(block[: min(left, _CHUNK)])
+                left -= _CHUNK
+
+
+def bench_solid_7z(tmp: Path, n_files: int) -> None:
+    try:
+        import py7zr
+    except ImportError:
+        print("--- 7z: py7zr não instalado, a saltar")
+        return
+    archive = tmp / "solido.7z"
+    with py7zr.SevenZipFile(archive, "w") as z:  # sólido por omissão
+        for i in range(n_files):
+            z.writestr(i.to_bytes(4, "little") * 4096, f"fotos/f{i:06d}.jpg")
+    print(f"--- 7z sólido com {n_files} jpg ({archive.stat().st_size / 1024 ** 2:.1f} MiB)")
+
+    res: dict = {}
+    with timer(res), py7zr.SevenZipFile(archive, "r") as z:
+        for name in z.getnames():
+            z.reset()
+            z.read([name])[name].read()
+    print(f"read por membro (antigo) {res['seconds']:8.2f} s  {fmt_rate(n_files, res['seconds'])}")
+
+    with timer(res):
+        for _, stream in iterate_archive(archive, ["jpg"], stream=True):
+            stream.read()
+    print(f"passagem única           {res['seconds']:8.2f} s  {fmt_rate(n_files, res['seconds'])}")
+
+
+def bench_rar(archives: list[Path]) -> None:
+    try:
+        import rarfile
+    except ImportError:
+        print("--- rar: rarfile não instalado, a saltar")
+        return
+    for archive in archives:
+        with rarfile.RarFile(archive) as r:
+            infos = [i for i in r.infolist() if not i.isdir()]
+            solid = r.is_solid()
+        exts = sorted({Path(i.filename).suffix.lstrip(".").lower() for i in infos})
+        print(f"--- {archive.name}: {len(infos)} membros, {'sólido' if solid else 'não sólido'}")
+
+        res: dict = {}
+        old: dict = {}
+        with timer(res), rarfile.RarFile(archive) as r:
+            for info in infos:
+                if info.is_symlink():
+                    continue
+                with r.open(info) as f:
+                    old[info.filename] = sum(map(len, iter(lambda: f.read(_CHUNK), b"")))
+        print(f"r.open por membro (antigo) {res['seconds']:8.2f} s  {fmt_rate(len(infos), res['seconds'])}")
+
+        new: dict = {}
+        with timer(res):
+            for name, stream in iterate_archive(archive, exts, stream=True):
+                new[name] = sum(map(len, iter(lambda: stream.read(_CHUNK), b"")))
+        print(f"uma chamada                {res['seconds']:8.2f} s  {fmt_rate(len(new), res['seconds'])}")
+        if old != new:
+            print(f"DIFERENÇA: {len(set(old) ^ set(new))} nomes, "
+                  f"{sum(old.get(n) != new.get(n) for n in old)} tamanhos")
+
+
+def run_mode(mode: str, archive: Path, tmp: Path) -> None:
+    """Corre num processo filho: imprime segundos e pico de RSS em MiB."""
+    t0 = time.perf_counter()
+    if mode == "copy_selected":
+        copy_selected(
+            archive.parent, tmp / "dst", {"mkv"}, include_archives=True, archive_types={"zip"}, secure_logging=False
+        )
+    elif mode == "BytesIO (antigo)":
+        with zipfile.ZipFile(archive) as z:
+            for info in z.infolist():
+                with z.open(info) as f:
+                    io.BytesIO(f.read()).getbuffer().nbytes
+    else:
+        for _, stream in iterate_archive(archive, ["mkv"], stream=mode == "stream"):
+            while stream.read(_CHUNK):
+                pass
+            stream.close()
+    seconds = time.perf_counter() - t0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB em Linux
+    print(f"{seconds:.3f} {rss_mb:.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--size-gb", type=float, default=2.0, help="tamanho descomprimido do membro")
+    ap.add_argument("--tmp", type=Path, default=None)
+    ap.add_argument("--7z-files", dest="sevenz_files", type=int, default=0, help="jpg no 7z sólido")
+    ap.add_argument("--rar", type=Path, nargs="+", default=[], help="RARs existentes a medir")
+    ap.add_argument("--skip-old", action="store_true", help="não correr o modo BytesIO")
+    ap.add_argument("--child", nargs=3, metavar=("MODO", "ARQUIVO", "TMP"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        mode, archive, tmp = args.child
+        run_mode(mode, Path(archive), Path(tmp))
+        return
+
+    size = int(args.size_gb * 1024 ** 3)
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        tmp = Path(tmp)
+        if args.rar:
+            bench_rar(args.rar)
+        if args.sevenz_files:
+            bench_solid_7z(tmp, args.sevenz_files)
+        (tmp / "src").mkdir()
+        archive = tmp / "src" / "dados.zip"
+        make_archive(archive, size)
+        print(f"--- membro de {size / 1024 ** 3:.1f} GiB ({archive.stat().st_size / 1024 ** 2:.1f} MiB no zip)")
+        for mode in MODES:
+            if mode.startswith("BytesIO") and args.skip_old:
+                continue
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(archive), str(tmp)],
+                cwd=ROOT, capture_output=True, text=True,
+            )
+            if out.returncode:
+                print(f"{mode:<17} falhou: {out.stderr.strip().splitlines()[-1:]}")
+                continue
+            seconds, rss = map(float, out.stdout.split()[-2:])
+            print(f"{mode:<17} {size / 1024 ** 2 / seconds:8.1f} MB/s  pico RSS {rss:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Débito de ``copy_selected`` em função do número de workers, para um
+corpus de ficheiros pequenos e outro de ficheiros grandes.
+
+Uso: ``python benchmarks/bench_copy.py [--small 5000] [--large 8] [--workers 1 2 4 8]``
+Para medir num disco concreto use ``--tmp /mnt/destino``. Com
+``--range-workers 4`` os ficheiros grandes são também copiados por intervalos
+em paralelo (limiar baixado para o tamanho dos ficheiros do corpus).
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from _common import fmt_rate, make_tree, timer
+
+from src.core.copier import copy_selected
+
+
+def _bench(label: str, src: Path, tmp: Path, workers: list[int], **kwargs) -> None:
+    for n in workers:
+        dst = tmp / f"dst_{label}_{n}"
+        stats: dict = {}
+        res: dict = {}
+        with timer(res):
+            copy_selected(src, dst, {"bin"}, stats=stats, secure_logging=False, workers=n, **kwargs)
+        secs = res["seconds"]
+        print(
+            f"{label:<8} workers={n:<3} ficheiros={stats['files_copied']:>7}  {secs:7.3f}s  "
+            f"{fmt_rate(stats['files_copied'], secs)} ficheiros  "
+            f"{stats['mb_copied'] / secs if secs else 0:8.1f} MB/s"
+        )
+        shutil.rmtree(dst, ignore_errors=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--small", type=int, default=5000, help="n.º de ficheiros de 4 KiB")
+    ap.add_argument("--large", type=int, default=8, help="n.º de ficheiros de 64 MiB")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--range-workers", type=int, default=0, help="threads por ficheiro grande (0 = não medir)")
+    ap.add_argument("--tmp", type=Path, default=None)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        tmp = Path(tmp)
+        small = make_tree(tmp / "small", args.small, size=4096, exts=("bin",))
+        _bench("pequenos", small, tmp, args.workers)
+        large = make_tree(tmp / "large", args.large, size=64 * 1024 * 1024, exts=("bin",))
+        _bench("grandes", large, tmp, args.workers)
+        if args.range_workers:
+            _bench(
+                f"grandes/r{args.range_workers}", large, tmp, args.workers,
+                range_workers=args.range_workers, range_threshold=64 * 1024 * 1024,
+            )
+
+
+if __name__ == "__main__":
+    main()
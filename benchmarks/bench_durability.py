@@ -0,0 +1,45 @@
+"""Compara os níveis de durabilidade de ``copy_selected`` num corpus de
+ficheiros pequenos (o caso em que o fsync por ficheiro mais pesa).
+
+Uso: ``python benchmarks/bench_durability.py [--files 2000] [--tmp /media/usb]``
+O ``--tmp`` deve apontar para o disco de destino que se quer avaliar.
+"""
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from _common import fmt_rate, make_tree, timer
+
+from src.core.copier import copy_selected
+from src.core.durability import LEVELS
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--size", type=int, default=16 * 1024)
+    ap.add_argument("--tmp", type=Path, default=None)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp) as tmp:
+        tmp = Path(tmp)
+        src = make_tree(tmp / "src", args.files, size=args.size, exts=("bin",))
+        for level in LEVELS:
+            dst = tmp / f"dst_{level}"
+            stats: dict = {}
+            res: dict = {}
+            with timer(res):
+                copy_selected(src, dst, {"bin"}, stats=stats, secure_logging=False, durability=level)
+            d = stats["durability"]
+            print(
+                f"{level:<11} {res['seconds']:7.3f}s  {fmt_rate(stats['files_copied'], res['seconds'])} ficheiros  "
+                f"fsyncs={d['fsyncs']:<6} checkpoints={d['checkpoints']}"
+            )
+            shutil.rmtree(dst, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Escrita atómica no destino: temporário na mesma pasta e depois rename.
+
+Os dados são escritos em ``.<nome>.<hex>.part`` ao lado do ficheiro final,
+com o espaço reservado de antemão (``posix_fallocate``) quando o tamanho é
+conhecido, e só no fim renomeados para o nome certo. Um crash deixa no pior
+caso um ``.part`` — apagado pela execução seguinte quando lista a pasta (ver
+``DestIndex``) — e nunca um ficheiro truncado com aspeto de válido.
+"""
+from __future__ import annotations
+
+import errno
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+PARTIAL_SUFFIX = ".part"
+_PARTIAL_RE = re.compile(r"^\..+\.[0-9a-f]{8}\.part$", re.IGNORECASE)
+# abaixo disto a reserva custa mais do que a fragmentação que evita
+_PREALLOC_MIN = 1024 * 1024
+# sistemas de ficheiros sem reserva de espaço: segue sem ela
+_NO_PREALLOC_ERRNOS = {errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP}
+# NAME_MAX (bytes em Linux, caracteres UTF-16 em Windows) menos ".", ".<hex8>" e ".part"
+_NAME_MAX = 255
+_TMP_BASE_MAX = _NAME_MAX - 1 - 9 - len(PARTIAL_SUFFIX)
+
+
+def partial_path(dst: Path) -> Path:
+    """Temporário de ``dst``; o nome é encurtado para caber em ``NAME_MAX``."""
+    base = dst.name
+    while len(os.fsencode(base)) > _TMP_BASE_MAX:
+        base = base[:-1]
+    return dst.with_name(f".{base}.{uuid.uuid4().hex[:8]}{PARTIAL_SUFFIX}")
+
+
+def is_partial(name: str) -> bool:
+    """True para nomes de temporários deixados por uma escrita interrompida."""
+    return bool(_PARTIAL_RE.match(name))
+
+
+def preallocate(fd: int, size: int) -> bool:
+    """Reserva ``size`` bytes para ``fd``; ``ENOSPC`` falha já, antes de escrever."""
+    if size < _PREALLOC_MIN or not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(fd, 0, size)
+        return True
+    except OSError as e:
+        if e.errno not in _NO_PREALLOC_ERRNOS:
+            raise
+        return False
+
+
+def trim(fd: int) -> None:
+    """Corta o espaço reservado que não chegou a ser escrito (a origem encolheu)."""
+    pos = os.lseek(fd, 0, os.SEEK_CUR)
+    if os.fstat(fd).st_size > pos:
+        os.ftruncate(fd, pos)
+
+
+@contextmanager
+def atomic_path(dst: Path) -> Iterator[Path]:
+    """Dá um temporário ao lado de ``dst``; renomeia-o para ``dst`` se o bloco terminar bem.
+
+    O ficheiro tem de estar fechado à saída do bloco (Windows não renomeia
+    ficheiros abertos). Em caso de erro o temporário é apagado.
+    """
+    tmp = partial_path(dst)
+    try:
+        yield tmp
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
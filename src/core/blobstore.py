@@ -0,0 +1,181 @@
+"""Destino endereçado por conteúdo: cada conteúdo distinto é guardado uma vez.
+
+Os dados ficam em ``objects/ab/cdef…`` (digest de ``core.hasher``) e a árvore
+habitual por extensão (``jpg/…``, ``pdf/…``) é feita de hardlinks para esses
+blobs. Fotografias iguais com nomes ou pastas diferentes, ou copiadas em
+execuções anteriores, ocupam espaço uma única vez. Em sistemas de ficheiros
+sem hardlinks (FAT/exFAT) a ligação fica registada em ``objects/links.jsonl``.
+Temporários em ``objects/tmp`` deixados por uma execução interrompida são
+apagados ao abrir o armazém.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from .atomic import preallocate, trim
+from .hasher import copy_hashing, new_hasher
+from .iopolicy import DEFAULT_POLICY, IOPolicy
+
+OBJECTS_DIR = "objects"
+LINKS_FILE = "links.jsonl"
+
+
+class BlobStore:
+    """Armazém de blobs em ``<raiz>/objects`` (thread-safe)."""
+
+    def __init__(self, root: Path, algo: str = "sha256", policy: IOPolicy = DEFAULT_POLICY):
+        self.root = Path(root)
+        self.algo = algo
+        self.policy = policy
+        self.objects = self.root / OBJECTS_DIR
+        self.tmp = self.objects / "tmp"
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        self.swept = self._sweep_tmp()
+        self._lock = threading.Lock()
+        self._links_fh = None
+        self.blobs_new = 0
+        self.blobs_reused = 0
+        self.logical_bytes = 0
+        self.stored_bytes = 0
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def store_file(
+        self,
+        src: Path,
+        size: int,
+        digest: Optional[str] = None,
+        on_written: Optional[Callable[[int], None]] = None,
+    ) -> tuple[str, int]:
+        """Guarda o conteúdo de ``src``; devolve ``(digest, bytes)``.
+
+        Com ``digest`` já conhecido (cache) e blob existente, não lê nada.
+        """
+        if digest is not None and self.blob_path(digest).exists():
+            self._count(size, new=False)
+            return digest, size
+        with open(src, "rb", buffering=0) as fsrc:
+            self.policy.start_read(fsrc.fileno())
+            try:
+                return self.store_stream(fsrc, on_written, stat_from=src, size_hint=size)
+            finally:
+                self.policy.done(fsrc.fileno())
+
+    def store_stream(
+        self,
+        stream: BinaryIO,
+        on_written: Optional[Callable[[int], None]] = None,
+        stat_from: Optional[Path] = None,
+        size_hint: int = 0,
+    ) -> tuple[str, int]:
+        """Escreve ``stream`` num temporário calculando o digest e publica-o como blob."""
+        h = new_hasher(self.algo)
+        tmp = self.tmp / uuid.uuid4().hex
+        try:
+            with open(tmp, "wb") as fh:
+                preallocate(fh.fileno(), size_hint)
+                size = copy_hashing(stream, fh, h, self.policy.size_for(size_hint))
+                fh.flush()
+                trim(fh.fileno())
+                if on_written:
+                    on_written(fh.fileno())
+                self.policy.done(fh.fileno())
+            digest = h.hexdigest()
+            blob = self.blob_path(digest)
+            blob.parent.mkdir(exist_ok=True)
+            try:
+                # link atómico: se outro worker (ou execução) já publicou, reutiliza
+                os.link(tmp, blob)
+                new = True
+            except FileExistsError:
+                new = False
+            except OSError:
+                # sem hardlinks: rename (atómico no mesmo sistema de ficheiros)
+                new = not blob.exists()
+                if new:
+                    os.replace(tmp, blob)
+            if new and stat_from is not None:
+                _copystat(stat_from, blob)
+        finally:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+        self._count(size, new=new)
+        return digest, size
+
+    def link(self, digest: str, dst: Path) -> str:
+        """Liga ``dst`` ao blob; devolve ``hardlink`` ou ``manifest``."""
+        blob = self.blob_path(digest)
+        try:
+            os.link(blob, dst)
+            return "hardlink"
+        except FileExistsError:
+            raise
+        except OSError:
+            entry = json.dumps(
+                {"dst": _rel(dst, self.root), "blob": _rel(blob, self.root)}, ensure_ascii=False
+            )
+            with self._lock:
+                if self._links_fh is None:
+                    self._links_fh = open(self.objects / LINKS_FILE, "a", encoding="utf-8")
+                self._links_fh.write(entry + "\n")
+            return "manifest"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs_new": self.blobs_new,
+                "blobs_reused": self.blobs_reused,
+                "logical_bytes": self.logical_bytes,
+                "stored_bytes": self.stored_bytes,
+                "bytes_saved": self.logical_bytes - self.stored_bytes,
+                "dedup_ratio": (self.logical_bytes / self.stored_bytes) if self.stored_bytes else None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._links_fh is not None:
+                self._links_fh.close()
+                self._links_fh = None
+
+    def _sweep_tmp(self) -> int:
+        swept = 0
+        with os.scandir(self.tmp) as it:
+            for entry in it:
+                try:
+                    os.unlink(entry.path)
+                    swept += 1
+                except OSError:
+                    pass
+        return swept
+
+    def _count(self, size: int, new: bool) -> None:
+        with self._lock:
+            self.logical_bytes += size
+            if new:
+                self.blobs_new += 1
+                self.stored_bytes += size
+            else:
+                self.blobs_reused += 1
+
+
+def _copystat(src: Path, dst: Path) -> None:
+    try:
+        st = os.stat(src)
+        os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def _rel(p: Path, base: Path) -> str:
+    try:
+        return p.relative_to(base).as_posix()
+    except ValueError:
+        return p.as_posix()
@@ -0,0 +1,138 @@
+"""Compressão dos ficheiros escritos no destino, por tipo, num pool de processos.
+
+Cada ficheiro elegível é gravado comprimido com um codec da biblioteca-padrão
+(``zlib`` em contentor gzip ``.gz``, ``bz2`` em ``.bz2`` ou ``lzma`` em
+``.xz``), restaurável com as ferramentas habituais (``gunzip``, ``xz -d``).
+A compressão corre num ``ProcessPoolExecutor``: as threads de cópia submetem
+o ficheiro e esperam, pelo que a CPU de vários núcleos é aproveitada sem o
+GIL. Os processos nunca são criados por ``fork`` (ver :func:`mp_context`).
+
+Não são comprimidos os tipos que já vêm comprimidos (``SKIP_EXTS``: imagens,
+vídeo, áudio, arquivos, pdf) nem ficheiros cujo primeiro bloco, comprimido
+com ``zlib`` nível 1, não desce abaixo de ``max_ratio`` do tamanho original.
+"""
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+from .hasher import copy_hashing, new_hasher
+from .iopolicy import DEFAULT_POLICY
+
+CODECS = {"zlib": ".gz", "bz2": ".bz2", "lzma": ".xz"}
+
+
+def mp_context():
+    """Contexto dos pools de processos: ``forkserver`` (ou ``spawn``), nunca ``fork``.
+
+    Os pools nascem com o scan e as threads de cópia a correr; um ``fork``
+    copiaria os locks que outras threads tivessem nesse instante (HashCache,
+    DestIndex…) e o filho podia bloquear para sempre.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+SKIP_EXTS = frozenset({
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "avif",
+    "mp3", "aac", "ogg", "flac", "m4a",
+    "mp4", "mkv", "avi", "mov", "webm",
+    "zip", "7z", "rar", "gz", "tgz", "bz2", "xz", "zst",
+    "pdf",
+})
+
+PROBE_BYTES = 64 * 1024
+MIN_SIZE = 4 * 1024
+
+
+class Compressor:
+    """Decide por ficheiro se comprime e comprime-o num processo do pool."""
+
+    def __init__(
+        self,
+        codec: str = "zlib",
+        level: Optional[int] = None,
+        workers: Optional[int] = None,
+        skip_exts: Optional[Iterable[str]] = None,
+        max_ratio: float = 0.9,
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"Codec de compressão inválido: {codec!r}. Opções: {', '.join(CODECS)}")
+        self.codec = codec
+        self.suffix = CODECS[codec]
+        self.level = level
+        self.workers = workers or os.cpu_count() or 1
+        self.skip_exts = SKIP_EXTS if skip_exts is None else frozenset(e.lower().lstrip(".") for e in skip_exts)
+        self.max_ratio = max_ratio
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def wants(self, path: Path, ext: str, size: int) -> bool:
+        """Tipo e amostra do primeiro bloco dizem se vale a pena comprimir."""
+        if ext in self.skip_exts or size < MIN_SIZE:
+            return False
+        with open(path, "rb") as fh:
+            block = fh.read(PROBE_BYTES)
+        return bool(block) and len(zlib.compress(block, 1)) < self.max_ratio * len(block)
+
+    def target(self, dst: Path) -> Path:
+        return dst.with_name(dst.name + self.suffix)
+
+    def compress(self, src: Path, dst: Path, algo: Optional[str] = None, size: int = 0) -> tuple[int, Optional[str]]:
+        """Grava ``src`` comprimido em ``dst``; devolve ``(bytes originais, digest do original)``."""
+        bufsize = DEFAULT_POLICY.size_for(size)
+        fut = self._executor().submit(
+            _compress_file, os.fspath(src), os.fspath(dst), self.codec, self.level, algo, bufsize
+        )
+        return fut.result()
+
+    def same_content(self, src: Path, dst: Path) -> tuple[bool, int]:
+        """Compara ``src`` com o conteúdo descomprimido de ``dst``; devolve ``(igual, bytes lidos)``."""
+        read = 0
+        with open(src, "rb") as fa, _open_codec(dst, self.codec, "rb") as fb:
+            while True:
+                ca, cb = fa.read(1024 * 1024), fb.read(1024 * 1024)
+                read += len(ca) + len(cb)
+                if ca != cb:
+                    return False, read
+                if not ca:
+                    return True, read
+
+    def close(self, cancel: bool = False) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=cancel)
+                self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=mp_context())
+            return self._pool
+
+
+def _open_codec(path: str | Path, codec: str, mode: str, level: Optional[int] = None) -> BinaryIO:
+    if codec == "zlib":
+        return gzip.open(path, mode, compresslevel=9 if level is None else level)
+    if codec == "bz2":
+        return bz2.open(path, mode, compresslevel=9 if level is None else level)
+    if "w" in mode:
+        return lzma.open(path, mode, preset=level)
+    return lzma.open(path, mode)
+
+
+def _compress_file(
+    src: str, dst: str, codec: str, level: Optional[int], algo: Optional[str], bufsize: int
+) -> tuple[int, Optional[str]]:
+    # corre noutro processo: só recebe e devolve valores simples
+    h = new_hasher(algo) if algo else None
+    with open(src, "rb") as fin, _open_codec(dst, codec, "wb", level) as fout:
+        nbytes = copy_hashing(fin, fout, h, bufsize)
+    return nbytes, h.hexdigest() if h else None
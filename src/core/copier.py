@@ -1,15 +1,43 @@
 from __future__ import annotations
 
+import errno
 import io
 import os
+import queue
+import re
 import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Iterable, Optional
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
 
 from .windows_vss import create_snapshot, delete_snapshot, VssSnapshot
-from .extractor import is_archive, iterate_archive
-from .scanner import scan
-from .hasher import file_hash
+from .extractor import ArchiveBackendError, count_archive_members, iterate_archive
+from .scanner import FileRecord, archive_suffixes, scan_records
+from .hasher import (
+    CompareResult,
+    Digest,
+    combine_range_digests,
+    compare_files,
+    copy_hashing,
+    file_hash,
+    new_hasher,
+    range_algo,
+    update_hash,
+)
+from .durability import Durability
+from .manifest import RunManifest
+from .hash_cache import HashCache
+from .dest_index import DestIndex, sweep_partials
+from .blobstore import BlobStore
+from .atomic import atomic_path, preallocate, trim
+from .iopolicy import IOPolicy, buffer
+from .journal import ResumeJournal, is_current
+from .packer import INDEX_NAME, PACKS_DIR, SegmentPacker
+from .compress import Compressor, mp_context
+from .governor import Governor
 from .secure_logging import create_secure_log_callback, sanitize_log_message
 
 
@@ -29,8 +57,147 @@ def _progress(cb: Optional[Callable[[int], None]], val: int) -> None:
         pass
 
 
-def _ensure_dir(p: Path) -> None:
-    p.parent.mkdir(parents=True, exist_ok=True)
+# Registos que o scan pode levar de avanço sobre a cópia (limita a memória)
+_SCAN_AHEAD = 100_000
+# De quantos em quantos itens novos se reporta o total ao ``total_cb``
+_TOTAL_STEP = 500
+
+
+class _TotalTracker:
+    """Total de itens conhecido até agora, reportado ao ``total_cb`` aos saltos."""
+
+    def __init__(self, cb: Optional[Callable[[int], None]], step: int = _TOTAL_STEP):
+        self._cb = cb
+        self._step = step
+        self._lock = threading.Lock()
+        self.value = 0
+        self._emitted = 0
+
+    def add(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+            if self.value - self._emitted >= self._step:
+                self._flush_locked()
+
+    def cover(self, processed: int) -> None:
+        """Garante que o total já reportado não fica abaixo do progresso."""
+        if processed > self._emitted:
+            self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        with self._lock:
+            if force or self.value != self._emitted:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._emitted = self.value
+        _progress(self._cb, self.value)
+
+
+def _scan_ahead(
+    items: Iterable,
+    stop_flag: Callable[[], bool],
+    on_item: Optional[Callable[[object], None]] = None,
+    maxsize: int = _SCAN_AHEAD,
+) -> Iterator:
+    """Consome ``items`` numa thread produtora e devolve-os pela mesma ordem.
+
+    O scan corre à frente da cópia (até ``maxsize`` itens), pelo que o total
+    reportado via ``on_item`` cresce enquanto os ficheiros já vão sendo
+    copiados, sem uma segunda travessia da origem. Exceções do scan são
+    relançadas no consumidor.
+    """
+    q: queue.Queue = queue.Queue(maxsize)
+    done = object()
+    closed = threading.Event()
+    error: list[BaseException] = []
+
+    def put(item) -> bool:
+        while not closed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer() -> None:
+        try:
+            for item in items:
+                if stop_flag():
+                    break
+                if on_item:
+                    on_item(item)
+                if not put(item):
+                    break
+        except Exception as e:
+            error.append(e)
+        finally:
+            put(done)
+
+    t = threading.Thread(target=producer, name="backup-scan", daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            yield item
+        if error:
+            raise error[0]
+    finally:
+        closed.set()
+        t.join()
+
+
+class _DirCache:
+    """Pastas de destino que já se sabe existirem.
+
+    Cada pasta é criada (ou confirmada) uma única vez por execução, em vez de
+    um ``mkdir(parents=True, exist_ok=True)`` por ficheiro, que percorre e faz
+    stat a toda a cadeia de pastas-mãe. Pastas criadas de raiz são marcadas
+    como vazias no ``DestIndex``, que assim não precisa de as listar.
+    """
+
+    def __init__(self, index: Optional[DestIndex] = None):
+        self._known: set[str] = set()
+        self._index = index
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def ensure(self, d: Path) -> None:
+        if os.fspath(d) in self._known:
+            return
+        with self._lock:
+            self._make(d)
+
+    def materialize(self, dirs: Iterable[Path]) -> None:
+        """Cria de uma vez o esqueleto de pastas do plano, antes da cópia."""
+        with self._lock:
+            for d in sorted(dirs):
+                self._make(d)
+
+    def _make(self, d: Path) -> None:
+        key = os.fspath(d)
+        if key in self._known:
+            return
+        try:
+            os.mkdir(d)
+            created = True
+        except FileExistsError:
+            created = False
+        except FileNotFoundError:
+            self._make(d.parent)
+            try:
+                os.mkdir(d)
+                created = True
+            except FileExistsError:
+                created = False
+        self._known.add(key)
+        if created:
+            self.created += 1
+            if self._index is not None:
+                self._index.add_dir(d)
 
 
 def _dst_from_src(src: Path, base_src: Path, base_dst: Path, preserve_structure: bool, ext_folder: str) -> Path:
@@ -51,16 +218,1016 @@ def _dst_from_src(src: Path, base_src: Path, base_dst: Path, preserve_structure:
     return path / filename
 
 
-def _resolve_conflict(path: Path) -> Path:
-    """Gera um caminho único caso o destino já exista."""
-    base = path.stem
-    suffix = path.suffix
-    counter = 1
-    new_path = path
-    while new_path.exists():
-        new_path = path.with_name(f"{base}_{counter}{suffix}")
-        counter += 1
-    return new_path
+_CONFLICT_SUFFIX_RE = re.compile(r"(_\d+)+$")
+
+
+def _conflict_key(dst_path: Path) -> tuple[str, str, str]:
+    """Chave da família de nomes que ``DestIndex.resolve_conflict`` pode gerar.
+
+    ``foto.jpg``, ``foto_1.jpg`` e ``foto_1_1.jpg`` na mesma pasta partilham a
+    chave; ficheiros de famílias diferentes nunca disputam o mesmo nome.
+    """
+    stem = _CONFLICT_SUFFIX_RE.sub("", dst_path.stem)
+    return str(dst_path.parent).lower(), stem.lower(), dst_path.suffix.lower()
+
+
+class _CopyPool:
+    """Pool limitado de threads de cópia com o mesmo resultado do modo série.
+
+    As tarefas da mesma família de destino (ver ``_conflict_key``) correm pela
+    ordem do scan, uma de cada vez, pelo que a existência do destino e a
+    resolução de conflitos decidem como decidiriam em série. O executor arranca as tarefas por ordem
+    FIFO: quando uma tarefa espera pela anterior, essa já está a correr.
+    """
+
+    def __init__(self, workers: int, backlog: int | None = None):
+        self._ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backup-copy")
+        self._slots = threading.BoundedSemaphore(backlog or workers * 4)
+        self._lock = threading.Lock()
+        self._last: dict[tuple, Future] = {}
+
+    def submit(self, key: tuple, fn: Callable[..., None], *args) -> None:
+        self._slots.acquire()
+        with self._lock:
+            prev = self._last.get(key)
+            fut = self._ex.submit(self._run, prev, fn, args)
+            self._last[key] = fut
+        fut.add_done_callback(lambda f: self._done(key, f))
+
+    @staticmethod
+    def _run(prev: Future | None, fn: Callable[..., None], args: tuple) -> None:
+        if prev is not None:
+            wait([prev])
+        fn(*args)
+
+    def _done(self, key: tuple, fut: Future) -> None:
+        self._slots.release()
+        with self._lock:
+            if self._last.get(key) is fut:
+                del self._last[key]
+
+    def close(self, cancel: bool = False) -> None:
+        self._ex.shutdown(wait=True, cancel_futures=cancel)
+
+
+_MB = 1024 * 1024
+
+# --- estratégias de cópia ----------------------------------------------------
+_FICLONE = 0x40049409  # _IOW(0x94, 9, int) em linux/fs.h
+# erros que significam "esta via não serve aqui", não falha do ficheiro
+_FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY,
+    errno.EBADF, errno.ETXTBSY, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+_BUF_SIZE = 1024 * 1024  # por chamada de copy_file_range/sendfile: x64
+# fora de POSIX os dados são copiados por ``shutil.copyfile`` (CopyFile do SO)
+_NATIVE_COPY = os.name != "posix"
+# cópia por intervalos em paralelo de ficheiros muito grandes
+_RANGE_THRESHOLD = 1024 * 1024 * 1024
+_RANGE_SIZE = 64 * 1024 * 1024
+
+
+class _CopyStrategies:
+    """Escolhe, por ficheiro, a forma mais barata de copiar os dados.
+
+    Com origem e destino no mesmo sistema de ficheiros (``st_dev`` igual):
+    hardlink (se permitido) e depois reflink ``FICLONE`` (btrfs/XFS). Caso
+    contrário, ou se essas vias falharem: ``os.copy_file_range``, ``sendfile``
+    e por fim cópia com buffer. Fora de POSIX usa ``shutil.copy2``. As vias
+    que um sistema de ficheiros recusa ficam memorizadas para os seguintes.
+    As leituras em user-space seguem a ``IOPolicy`` (buffer e dicas de cache);
+    com um ``Governor`` cada bloco copiado é descontado nos seus limites.
+    Ficheiros a partir de ``range_threshold`` podem ser copiados por
+    intervalos em paralelo (:meth:`copy_ranges`).
+    """
+
+    def __init__(
+        self,
+        dst_dev: int | None,
+        allow_hardlinks: bool = False,
+        policy: IOPolicy | None = None,
+        range_workers: int = 1,
+        range_threshold: int = _RANGE_THRESHOLD,
+        range_size: int | None = None,
+        governor: Governor | None = None,
+    ):
+        self.dst_dev = dst_dev
+        self.allow_hardlinks = allow_hardlinks
+        self.policy = policy or IOPolicy()
+        self.range_workers = range_workers
+        self.range_threshold = range_threshold
+        self.range_size = range_size or _RANGE_SIZE
+        self.governor = governor
+        self._no_reflink: set[int] = set()
+        self._no_copy_range = not hasattr(os, "copy_file_range")
+        self._no_sendfile = not hasattr(os, "sendfile")
+        self._range_pool: ThreadPoolExecutor | None = None
+        self._range_lock = threading.Lock()
+
+    def wants_ranges(self, rec: FileRecord) -> bool:
+        if self.range_workers < 2 or rec.size < self.range_threshold or not hasattr(os, "preadv"):
+            return False
+        # um hardlink continua a ser mais barato do que qualquer cópia
+        return not (self.allow_hardlinks and rec.device and rec.device == self.dst_dev)
+
+    def copy_ranges(
+        self,
+        rec: FileRecord,
+        dst: Path,
+        on_written: Optional[Callable[[int], None]] = None,
+        algo: str | None = None,
+    ) -> tuple[str, Optional[str]]:
+        """Copia ``rec.path`` em intervalos de ``range_size`` bytes, vários ao mesmo tempo.
+
+        Cada intervalo vai por ``copy_file_range`` com offsets, ou por
+        ``preadv``/``pwrite`` se for preciso o digest, para um destino
+        pré-alocado. Com ``algo`` devolve o digest por intervalos (ver
+        ``hasher.range_algo``); com reflink só a leitura para o digest é
+        repartida. Devolve ``(estratégia, digest)``.
+        """
+        same_fs = bool(rec.device) and rec.device == self.dst_dev
+        with atomic_path(dst) as tmp:
+            fd_in = os.open(rec.path, os.O_RDONLY)
+            try:
+                fd_out = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+                try:
+                    self.policy.start_read(fd_in)
+                    reflinked = same_fs and self._reflink(fd_in, fd_out, rec.device)
+                    if not reflinked:
+                        preallocate(fd_out, rec.size)
+                    if reflinked and algo is None:
+                        results = []
+                    else:
+                        pool = self._ranges()
+                        futures = [
+                            pool.submit(
+                                self._copy_range, fd_in, None if reflinked else fd_out,
+                                off, min(self.range_size, rec.size - off), algo,
+                            )
+                            for off in range(0, rec.size, self.range_size)
+                        ]
+                        # esperar por todos antes de fechar os descritores, mesmo com erro
+                        wait(futures)
+                        results = [f.result() for f in futures]
+                    written = sum(n for n, _ in results)
+                    if not reflinked and written < rec.size:
+                        os.ftruncate(fd_out, written)  # a origem encolheu entretanto
+                    if on_written:
+                        on_written(fd_out)
+                    self.policy.done(fd_in, fd_out)
+                finally:
+                    os.close(fd_out)
+            finally:
+                os.close(fd_in)
+            shutil.copystat(rec.path, tmp)
+        digest = combine_range_digests(algo, [d for _, d in results]) if algo else None
+        return ("reflink" if reflinked else "ranges"), digest
+
+    def close(self) -> None:
+        if self._range_pool is not None:
+            self._range_pool.shutdown(wait=True)
+
+    def _ranges(self) -> ThreadPoolExecutor:
+        with self._range_lock:
+            if self._range_pool is None:
+                self._range_pool = ThreadPoolExecutor(self.range_workers, thread_name_prefix="range")
+            return self._range_pool
+
+    def _copy_range(
+        self, fd_in: int, fd_out: int | None, offset: int, length: int, algo: str | None
+    ) -> tuple[int, Optional[str]]:
+        """Copia (ou só lê, com ``fd_out=None``) um intervalo; devolve ``(bytes, digest)``."""
+        end = offset + length
+        pos = offset
+        if algo is None and fd_out is not None and not self._no_copy_range:
+            try:
+                while pos < end:
+                    n = os.copy_file_range(fd_in, fd_out, min(end - pos, self._chunk()), pos, pos)
+                    if not n:
+                        break
+                    self._charge(n, fd_out is not None)
+                    pos += n
+                return pos - offset, None
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                pos = offset  # refaz o intervalo com buffer; o resto do ficheiro não é afetado
+
+        h = new_hasher(algo) if algo else None
+        buf = buffer(min(self.policy.size_for(length), length))
+        while pos < end:
+            n = os.preadv(fd_in, [buf[: end - pos]], pos)
+            if not n:
+                break
+            chunk = buf[:n]
+            if h is not None:
+                h.update(chunk)
+            if fd_out is not None:
+                done = 0
+                while done < n:
+                    done += os.pwrite(fd_out, chunk[done:], pos + done)
+            self._charge(n, fd_out is not None)
+            pos += n
+        return pos - offset, h.hexdigest() if h else None
+
+    def copy(
+        self,
+        rec: FileRecord,
+        dst: Path,
+        on_written: Optional[Callable[[int], None]] = None,
+        h=None,
+    ) -> str:
+        """Copia ``rec.path`` para ``dst`` (dados e metadados); devolve a estratégia usada.
+
+        ``on_written`` recebe o descritor do destino, ainda aberto, depois de
+        escritos os dados (não é chamado para hardlinks: não há dados novos).
+        Com ``h`` (objeto ``hashlib``) o digest é calculado na mesma leitura
+        da cópia; as vias sem leitura em user-space (reflink, hardlink) leem a
+        origem uma vez só para o digest, e ``copy_file_range``/``sendfile``
+        dão lugar à cópia com buffer para não ler os dados duas vezes.
+        """
+        same_fs = bool(rec.device) and rec.device == self.dst_dev
+        policy = self.policy
+        bufsize = policy.size_for(rec.size, rec.device)
+        if same_fs and self.allow_hardlinks:
+            try:
+                os.link(rec.path, dst)
+                if h is not None:
+                    with open(rec.path, "rb", buffering=0) as fsrc:
+                        policy.start_read(fsrc.fileno())
+                        update_hash(self._reader(fsrc, write=False), h, bufsize)
+                        policy.done(fsrc.fileno())
+                return "hardlink"
+            except OSError:
+                pass
+        # os dados vão para um temporário ao lado de ``dst`` (core.atomic)
+        if _NATIVE_COPY and h is None:
+            with atomic_path(dst) as tmp:
+                shutil.copyfile(rec.path, tmp)
+                if on_written:
+                    # em Windows o fsync (FlushFileBuffers) exige acesso de escrita
+                    with open(tmp, "r+b") as fh:
+                        on_written(fh.fileno())
+                # só depois: o atributo só de leitura da origem impediria o r+b
+                shutil.copystat(rec.path, tmp)
+            return "copy2"
+
+        with atomic_path(dst) as tmp:
+            with open(rec.path, "rb", buffering=0) as fsrc, open(tmp, "wb") as fdst:
+                policy.start_read(fsrc.fileno())
+                if h is None:
+                    strategy = self._copy_data(
+                        fsrc.fileno(), fdst.fileno(), rec.device if same_fs else None, rec.size, bufsize
+                    )
+                elif same_fs and self._reflink(fsrc.fileno(), fdst.fileno(), rec.device):
+                    update_hash(self._reader(fsrc, write=False), h, bufsize)
+                    strategy = "reflink"
+                else:
+                    preallocate(fdst.fileno(), rec.size)
+                    copy_hashing(self._reader(fsrc), fdst, h, bufsize)
+                    fdst.flush()
+                    trim(fdst.fileno())
+                    strategy = "buffered"
+                if on_written:
+                    on_written(fdst.fileno())
+                policy.done(fsrc.fileno(), fdst.fileno())
+            shutil.copystat(rec.path, tmp)
+        return strategy
+
+    def _reflink(self, fd_in: int, fd_out: int, dev: int) -> bool:
+        if os.name != "posix" or dev in self._no_reflink:
+            return False
+        try:
+            import fcntl
+            fcntl.ioctl(fd_out, _FICLONE, fd_in)
+            return True
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+            self._no_reflink.add(dev)
+            return False
+
+    def _copy_data(
+        self, fd_in: int, fd_out: int, same_dev: int | None, size: int = 0, bufsize: int = _BUF_SIZE
+    ) -> str:
+        if same_dev is not None and self._reflink(fd_in, fd_out, same_dev):
+            return "reflink"
+        if preallocate(fd_out, size):
+            try:
+                return self._copy_bytes(fd_in, fd_out, bufsize)
+            finally:
+                trim(fd_out)
+        return self._copy_bytes(fd_in, fd_out, bufsize)
+
+    def _copy_bytes(self, fd_in: int, fd_out: int, bufsize: int = _BUF_SIZE) -> str:
+        if not self._no_copy_range:
+            try:
+                while n := os.copy_file_range(fd_in, fd_out, self._chunk()):
+                    self._charge(n)
+                return "copy_file_range"
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                if e.errno == errno.ENOSYS:
+                    self._no_copy_range = True
+                _rewind(fd_in, fd_out)
+
+        if not self._no_sendfile:
+            try:
+                offset = 0
+                while True:
+                    sent = os.sendfile(fd_out, fd_in, offset, self._chunk())
+                    if not sent:
+                        break
+                    self._charge(sent)
+                    offset += sent
+                return "sendfile"
+            except OSError as e:
+                if e.errno not in _FALLBACK_ERRNOS:
+                    raise
+                if e.errno in (errno.ENOSYS, errno.EINVAL):
+                    self._no_sendfile = True
+                _rewind(fd_in, fd_out)
+
+        buf = buffer(bufsize)
+        while True:
+            n = os.readv(fd_in, [buf])
+            if not n:
+                break
+            view = buf[:n]
+            while view:
+                view = view[os.write(fd_out, view):]
+            self._charge(n)
+        return "buffered"
+
+    def _chunk(self) -> int:
+        # com limites, blocos menores deixam o governador intervir mais vezes
+        return _BUF_SIZE if self.governor is not None and self.governor.limited else _BUF_SIZE * 64
+
+    def _charge(self, nbytes: int, write: bool = True) -> None:
+        if self.governor is not None:
+            if write:
+                self.governor.copy(nbytes)
+            else:
+                self.governor.read(nbytes)
+
+    def _reader(self, fobj: BinaryIO, write: bool = True) -> BinaryIO:
+        if self.governor is None:
+            return fobj
+        return self.governor.wrap(fobj, self.governor.copy if write else self.governor.read)
+
+
+def _rewind(fd_in: int, fd_out: int) -> None:
+    # recomeça do zero depois de uma via que falhou a meio
+    os.lseek(fd_in, 0, os.SEEK_SET)
+    os.lseek(fd_out, 0, os.SEEK_SET)
+    os.ftruncate(fd_out, 0)
+
+
+@dataclass
+class _CopyContext:
+    """Estado partilhado pelas tarefas de um ``copy_selected`` (thread-safe)."""
+    base_src: Path
+    base_dst: Path
+    preserve_structure: bool
+    stats: dict
+    log: Optional[Callable[[str], None]]
+    progress_cb: Optional[Callable[[int], None]]
+    total: _TotalTracker
+    stop_flag: Callable[[], bool]
+    strategies: _CopyStrategies
+    durability: Durability
+    manifest: Optional[RunManifest] = None
+    hash_cache: Optional[HashCache] = None
+    blobs: Optional[BlobStore] = None
+    journal: Optional[ResumeJournal] = None
+    packer: Optional[SegmentPacker] = None
+    compressor: Optional[Compressor] = None
+    governor: Optional[Governor] = None
+    dest_index: DestIndex = field(default_factory=DestIndex)
+    dirs: _DirCache = field(init=False)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    processed: int = 0
+
+    def __post_init__(self) -> None:
+        self.dirs = _DirCache(self.dest_index)
+
+    def bump(self, **deltas: float) -> None:
+        with self.lock:
+            for key, n in deltas.items():
+                self.stats[key] += n
+
+    def count_copy(self, ext: str, mb: float, from_archive: bool = False) -> None:
+        with self.lock:
+            st = self.stats
+            st["files_copied"] += 1
+            st["mb_copied"] += mb
+            st["ext_counts"][ext] = st["ext_counts"].get(ext, 0) + 1
+            st["ext_sizes"][ext] = st["ext_sizes"].get(ext, 0.0) + mb
+            if from_archive:
+                st["ext_from_archives"][ext] = st["ext_from_archives"].get(ext, 0) + 1
+
+    def count_compressed(self, ext: str, nbytes_in: int, nbytes_out: int | None) -> None:
+        """``nbytes_out=None``: ficheiro deixado sem compressão (tipo ou amostra)."""
+        with self.lock:
+            comp = self.stats["compression"]
+            if nbytes_out is None:
+                comp["skipped"] += 1
+                return
+            comp["files"] += 1
+            comp["bytes_in"] += nbytes_in
+            comp["bytes_out"] += nbytes_out
+            entry = comp["ext_bytes"].setdefault(ext, {"in": 0, "out": 0})
+            entry["in"] += nbytes_in
+            entry["out"] += nbytes_out
+            comp["ext_ratios"][ext] = entry["out"] / entry["in"] if entry["in"] else 1.0
+
+    def count_compare(self, res: CompareResult, full_bytes: int) -> None:
+        """``full_bytes``: o que a comparação antiga (hash completo dos dois) leria."""
+        with self.lock:
+            cmp = self.stats["compare"]
+            cmp["tiers"][res.tier] = cmp["tiers"].get(res.tier, 0) + 1
+            cmp["bytes_read"] += res.bytes_read
+            cmp["bytes_saved"] += max(0, full_bytes - res.bytes_read)
+
+    def count_strategy(self, strategy: str, nbytes: int) -> None:
+        with self.lock:
+            entry = self.stats["copy_strategies"].setdefault(strategy, {"files": 0, "bytes": 0})
+            entry["files"] += 1
+            entry["bytes"] += nbytes
+
+    def count_resumed(self, nbytes: int, items: int = 1) -> None:
+        with self.lock:
+            self.stats["resume"]["skipped"] += items
+            self.stats["resume"]["mb_skipped"] += nbytes / _MB
+
+    def packs(self, rec: FileRecord) -> bool:
+        """True se ``rec`` vai para um segmento em vez da árvore normal."""
+        return self.packer is not None and self.packer.accepts(rec.size)
+
+    def source_key(self, path: Path, inner_name: str | None = None) -> str:
+        """Chave da origem no diário: caminho relativo (``arquivo.zip!membro``)."""
+        try:
+            key = path.relative_to(self.base_src).as_posix()
+        except ValueError:
+            key = path.as_posix()
+        return key if inner_name is None else f"{key}!{inner_name}"
+
+    def throttle(self, read: int = 0, copied: int = 0, files: int = 0) -> None:
+        """Desconta no governador o trabalho feito fora de ``_CopyStrategies``."""
+        gov = self.governor
+        if gov is None:
+            return
+        for _ in range(files):
+            gov.file()
+        if read:
+            gov.read(read)
+        if copied:
+            gov.copy(copied)
+
+    def advance(self, n: int = 1) -> None:
+        # sob o lock para o progresso chegar ao callback sempre por ordem
+        with self.lock:
+            self.processed += n
+            self.total.cover(self.processed)
+            _progress(self.progress_cb, self.processed)
+
+
+def _stat_or_none(path: Path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _cached_digest(ctx: _CopyContext, path: Path, size: int, mtime_ns: int, inode: int, algo: str) -> Digest:
+    """Digest de ``path`` para ``compare_files``.
+
+    Devolve o digest (str) se a cache persistente o tiver, uma função que o
+    calcula e guarda na cache se não tiver, ou ``None`` sem cache: nesse caso
+    a comparação termina pela leitura em paralelo, que para mais cedo.
+    """
+    cache = ctx.hash_cache
+    if not cache:
+        return None
+    digest = cache.get(path, size, mtime_ns, inode, algo)
+    if digest:
+        return digest
+
+    def compute() -> str:
+        value = file_hash(path, algo, ctx.strategies.policy)
+        ctx.throttle(read=size)
+        cache.put(path, size, mtime_ns, inode, algo, value)
+        return value
+
+    return compute
+
+
+def _write_file(
+    ctx: _CopyContext, rec: FileRecord, dst_path: Path, algo: str, compressed: bool = False
+) -> tuple[str, Optional[str], str]:
+    """Escreve o conteúdo de ``rec`` em ``dst_path``; devolve ``(estratégia, digest, algoritmo)``.
+
+    O digest só é conhecido se foi calculado pelo caminho (manifesto ou
+    blobs); nas cópias por intervalos é o digest por intervalos, com o
+    algoritmo correspondente. Com ``compressed`` o digest é o do original.
+    """
+    def on_written(fd: int) -> None:
+        ctx.durability.file_written(fd, dst_path, rec.size)
+
+    if compressed:
+        with atomic_path(dst_path) as tmp:
+            _, digest = ctx.compressor.compress(rec.path, tmp, algo if ctx.manifest else None, rec.size)
+            ctx.throttle(copied=rec.size)
+            with open(tmp, "rb") as fh:
+                on_written(fh.fileno())
+            shutil.copystat(rec.path, tmp)
+        return f"compress:{ctx.compressor.codec}", digest, algo
+
+    if ctx.blobs:
+        cache = ctx.hash_cache
+        known = cache.get(rec.path, rec.size, rec.mtime_ns, rec.inode, algo) if cache else None
+        digest, _ = ctx.blobs.store_file(rec.path, rec.size, known, on_written=on_written)
+        ctx.throttle(copied=rec.size)
+        return "blob:" + ctx.blobs.link(digest, dst_path), digest, algo
+
+    strategies = ctx.strategies
+    if strategies.wants_ranges(rec):
+        strategy, digest = strategies.copy_ranges(
+            rec, dst_path, on_written=on_written, algo=algo if ctx.manifest else None
+        )
+        return strategy, digest, range_algo(algo, strategies.range_size)
+
+    h = new_hasher(algo) if ctx.manifest else None
+    strategy = strategies.copy(rec, dst_path, on_written=on_written, h=h)
+    return strategy, h.hexdigest() if h else None, algo
+
+
+def _pack_file(ctx: _CopyContext, rec: FileRecord, dst_path: Path, ext_folder: str) -> None:
+    """Acrescenta um ficheiro pequeno ao segmento da sua extensão (``core.packer``)."""
+    path = rec.path
+    try:
+        logical = dst_path.relative_to(ctx.base_dst).as_posix()
+        packed, entry = ctx.packer.pack(path, logical, ext_folder, rec.mtime_ns)
+        ctx.throttle(read=rec.size, copied=rec.size if packed else 0)
+        if not packed:
+            _emit(ctx.log, f"⚖️  Já existe igual (empacotado): {entry.path}")
+        else:
+            if ctx.manifest:
+                member = f"{PACKS_DIR}/{entry.segment}!{entry.path}"
+                ctx.manifest.add(path, member, rec.size, entry.digest, entry.algo)
+            ctx.count_copy(ext_folder, rec.size / _MB)
+            ctx.count_strategy("pack", rec.size)
+            _emit(ctx.log, f"✔ Empacotado: {path} -> {entry.segment}!{entry.path}")
+    except PermissionError as e:
+        ctx.bump(files_denied=1)
+        _emit(ctx.log, f"⚠️  Sem acesso: {path} ({e})")
+    except Exception as e:
+        _emit(ctx.log, f"❌ Erro ao empacotar {path}: {e}")
+
+    ctx.advance()
+
+
+def _copy_file(ctx: _CopyContext, rec: FileRecord, dst_path: Path, ext_folder: str) -> None:
+    """Copia um ficheiro do scan para ``dst_path`` (ou conclui que já lá está igual)."""
+    if ctx.stop_flag():
+        return
+    ctx.throttle(files=1)
+    if ctx.packs(rec):
+        # sem diário: o índice dos segmentos já diz o que está feito
+        _pack_file(ctx, rec, dst_path, ext_folder)
+        return
+    path = rec.path
+    size_mb = rec.size / _MB
+    algo = ctx.blobs.algo if ctx.blobs else ctx.manifest.algo if ctx.manifest else "sha256"
+    try:
+        compressed = bool(ctx.compressor) and ctx.compressor.wants(path, ext_folder, rec.size)
+        if compressed:
+            dst_path = ctx.compressor.target(dst_path)
+        copy_this = True
+        dst_st = _stat_or_none(dst_path) if ctx.dest_index.exists(dst_path) else None
+        if dst_st is not None:
+            try:
+                if compressed:
+                    # tamanhos e digests do destino são os do ficheiro comprimido
+                    equal, nread = ctx.compressor.same_content(path, dst_path)
+                    res = CompareResult(equal, "decompress", nread)
+                else:
+                    # se o destino foi escrito nesta execução o digest já é conhecido
+                    dst_digest = (ctx.manifest and ctx.manifest.digest_of(dst_path)) or _cached_digest(
+                        ctx, dst_path, dst_st.st_size, dst_st.st_mtime_ns, dst_st.st_ino, algo
+                    )
+                    src_digest = _cached_digest(ctx, path, rec.size, rec.mtime_ns, rec.inode, algo)
+                    res = compare_files(path, dst_path, rec.size, dst_st.st_size, src_digest, dst_digest)
+                ctx.count_compare(res, rec.size + dst_st.st_size)
+                ctx.throttle(read=res.bytes_read)
+                if res.equal:
+                    _emit(ctx.log, f"⚖️  Já existe igual: {dst_path}")
+                    copy_this = False
+                else:
+                    dst_path = ctx.dest_index.resolve_conflict(dst_path)
+                    _emit(ctx.log, f"➕  Ficheiro semelhante, a guardar como {dst_path.name}")
+            except Exception as e:
+                _emit(ctx.log, f"❌ Erro ao comparar {path} com {dst_path}: {e}")
+                dst_path = ctx.dest_index.resolve_conflict(dst_path)
+
+        if copy_this:
+            # a pasta já foi criada por quem planeou a cópia
+            ctx.dest_index.add(dst_path)
+            strategy, digest, digest_algo = _write_file(ctx, rec, dst_path, algo, compressed)
+            if digest:
+                if ctx.manifest:
+                    ctx.manifest.add(path, dst_path, rec.size, digest, digest_algo)
+                if ctx.hash_cache:
+                    ctx.hash_cache.put(path, rec.size, rec.mtime_ns, rec.inode, digest_algo, digest)
+                    # ausente se a ligação ficou só no manifesto; comprimido não tem o digest do original
+                    dst_st = None if compressed else _stat_or_none(dst_path)
+                    if dst_st is not None:
+                        ctx.hash_cache.put_stat(dst_path, dst_st, digest_algo, digest)
+            if ctx.compressor:
+                ctx.count_compressed(ext_folder, rec.size, os.stat(dst_path).st_size if compressed else None)
+            # o tamanho copiado é o do registo do scan: não volta a fazer stat
+            ctx.count_copy(ext_folder, size_mb)
+            ctx.count_strategy(strategy, rec.size)
+            _emit(ctx.log, f"✔ Copiado: {path} -> {dst_path}")
+        if ctx.journal:
+            ctx.journal.record(
+                ctx.source_key(path), rec.size, rec.mtime_ns, dst_path, digest if copy_this else None
+            )
+    except PermissionError as e:
+        ctx.bump(files_denied=1)
+        _emit(ctx.log, f"⚠️  Sem acesso: {path} ({e})")
+    except Exception as e:
+        _emit(ctx.log, f"❌ Erro ao copiar {path}: {e}")
+
+    ctx.advance()
+
+
+def _write_stream(
+    ctx: _CopyContext, stream: BinaryIO, dst_path: Path, replace: bool = False
+) -> tuple[int, str, Optional[str]]:
+    """Escreve um membro de arquivo em ``dst_path``; devolve ``(bytes, estratégia, digest)``."""
+    size = _stream_size(stream)
+    if ctx.governor is not None:
+        stream = ctx.governor.wrap(stream)
+    if ctx.blobs:
+        digest, nbytes = ctx.blobs.store_stream(
+            stream,
+            on_written=lambda fd: ctx.durability.file_written(fd, dst_path, os.fstat(fd).st_size),
+            size_hint=size,
+        )
+        if replace:
+            # a extração substitui o que lá estiver, como o open(..., "wb")
+            try:
+                os.unlink(dst_path)
+            except FileNotFoundError:
+                pass
+        return nbytes, "blob:" + ctx.blobs.link(digest, dst_path), digest
+
+    h = new_hasher(ctx.manifest.algo) if ctx.manifest else None
+    policy = ctx.strategies.policy
+    # substitui o que lá estiver só quando o membro foi escrito por inteiro
+    with atomic_path(dst_path) as tmp:
+        with open(tmp, "wb") as fh:
+            preallocate(fh.fileno(), size)
+            nbytes = copy_hashing(stream, fh, h, policy.size_for(size))
+            fh.flush()
+            trim(fh.fileno())
+            ctx.durability.file_written(fh.fileno(), dst_path, nbytes)
+            policy.done(fh.fileno())
+    return nbytes, "buffered", h.hexdigest() if h else None
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    """Tamanho do membro se se souber sem o ler (0 caso contrário)."""
+    if isinstance(stream, io.BytesIO):
+        return stream.getbuffer().nbytes
+    # tamanho declarado no arquivo (``extractor.iterate_archive``)
+    return getattr(stream, "member_size", 0) or 0
+
+
+def _extract_archive(ctx: _CopyContext, rec: FileRecord, extensions: Iterable[str]) -> None:
+    """Extrai de ``rec.path`` os ficheiros internos pretendidos."""
+    path = rec.path
+    journal = ctx.journal
+    try:
+        if journal:
+            # só com as mesmas extensões e com todos os membros ainda no destino
+            done = journal.completed(ctx.source_key(path, ""), rec.size, rec.mtime_ns, extensions)
+            if done:
+                # arquivo extraído por completo numa execução anterior
+                ctx.total.add(done["members"])
+                ctx.count_resumed(0, done["members"])
+                ctx.advance(done["members"])
+                _emit(ctx.log, f"⏩ Já extraído: {path}")
+                return
+        # total a partir dos cabeçalhos; se não der, conta-se ao extrair
+        counted = count_archive_members(path, extensions)
+        if counted:
+            ctx.total.add(counted)
+        members = 0
+        dsts: list[Path] = []
+        # cada membro é escrito antes de passar ao seguinte: sem cópia intermédia
+        for inner_name, stream in iterate_archive(path, extensions, stream=True):
+            if ctx.stop_flag():
+                break
+            if counted is None:
+                ctx.total.add()
+            members += 1
+            ctx.throttle(files=1)
+            member_key = ctx.source_key(path, inner_name)
+            done = journal.completed(member_key, rec.size, rec.mtime_ns) if journal else None
+            if done:
+                dsts.append(ctx.base_dst / done["dst"])
+                ctx.count_resumed(0)
+                ctx.advance()
+                continue
+            # Monta destino: pasta = extensão do ficheiro interno
+            inner_ext = Path(inner_name).suffix.lstrip(".").lower() or "_sem_ext"
+            dst_path = _dst_from_src(
+                path.parent / inner_name,
+                ctx.base_src,
+                ctx.base_dst,
+                ctx.preserve_structure,
+                inner_ext,
+            )
+            ctx.dirs.ensure(dst_path.parent)
+            existed = ctx.dest_index.exists(dst_path)
+            ctx.dest_index.add(dst_path)
+            nbytes, strategy, digest = _write_stream(ctx, stream, dst_path, replace=existed)
+            ctx.count_copy(inner_ext, nbytes / _MB, from_archive=True)
+            ctx.count_strategy(strategy, nbytes)
+            if ctx.manifest:
+                ctx.manifest.add(ctx.manifest.member_name(path, inner_name), dst_path, nbytes, digest)
+            if journal:
+                journal.record(member_key, rec.size, rec.mtime_ns, dst_path, digest)
+            dsts.append(dst_path)
+            _emit(ctx.log, f"✔ Extraído: {path}!{inner_name} -> {dst_path}")
+            ctx.advance()
+        if journal and not ctx.stop_flag():
+            journal.record(
+                ctx.source_key(path, ""), rec.size, rec.mtime_ns,
+                members=members, extensions=extensions, dsts=dsts,
+            )
+    except ArchiveBackendError as e:
+        _emit(ctx.log, f"⚠️  {path}: {e}")
+    except Exception as e:
+        _emit(ctx.log, f"❌ Erro ao extrair {path}: {e}")
+
+
+class _ArchiveRecorder:
+    """Manifesto e diário de um processo de arquivos: regista as chamadas para o pai as repetir.
+
+    ``entries`` são as entradas do diário do pai para os arquivos do grupo.
+    """
+
+    def __init__(self, root: Path, algo: str | None, entries: dict[str, dict] | None):
+        self.root = root
+        self.algo = algo
+        self.entries = entries or {}
+        self.events: list[tuple] = []
+
+    def member_name(self, archive: Path, inner_name: str) -> tuple[Path, str]:
+        return archive, inner_name
+
+    def add(self, src: tuple[Path, str], dst: Path, size: int, digest: str, algo: str | None = None) -> None:
+        self.events.append(("add", src, dst, size, digest, algo))
+
+    def completed(self, key: str, size: int, mtime_ns: int, extensions=None) -> Optional[dict]:
+        # a mesma regra de ResumeJournal.completed; o pai marca a chave como vista
+        entry = self.entries.get(key)
+        if not is_current(entry, self.root, size, mtime_ns, extensions):
+            return None
+        self.events.append(("completed", key, size, mtime_ns, extensions))
+        return entry
+
+    def record(self, *args, **kwargs) -> None:
+        self.events.append(("record", args, kwargs))
+
+    def replay(self, manifest: Optional[RunManifest], journal: Optional[ResumeJournal]) -> None:
+        for kind, *args in self.events:
+            if kind == "add":
+                (archive, inner_name), dst, size, digest, algo = args
+                manifest.add(manifest.member_name(archive, inner_name), dst, size, digest, algo)
+            elif kind == "completed":
+                journal.completed(*args)
+            else:
+                journal.record(*args[0], **args[1])
+
+
+@dataclass
+class _ArchiveJob:
+    """Um grupo de ``_archive_groups``, processado num só processo (valores simples)."""
+    base_src: Path
+    base_dst: Path
+    preserve_structure: bool
+    extensions: list[str]
+    records: list[FileRecord]
+    durability: str
+    io_policy: str
+    cache_hints: bool
+    algo: str | None
+    journal_entries: dict[str, dict] | None
+    governed: bool
+
+
+_archive_cancel = None  # multiprocessing.Event de cada processo do pool
+_archive_limits = None  # multiprocessing.Array com os limites de cada processo (0 = sem limite)
+_LIMIT_KEYS = ("read_bps", "write_bps", "files_per_sec")
+
+
+def _init_archive_worker(cancel, limits) -> None:
+    global _archive_cancel, _archive_limits
+    _archive_cancel = cancel
+    _archive_limits = limits
+
+
+def _share_limits(shared, governor: Governor, workers: int) -> dict:
+    """Reparte os limites de ``governor`` pelos ``workers`` processos em ``shared``."""
+    limits = governor.limits()
+    shared[:] = [(limits[k] or 0.0) / workers for k in _LIMIT_KEYS]
+    return limits
+
+
+def _apply_shared_limits(gov: Governor, last: tuple | None) -> tuple:
+    current = tuple(_archive_limits[:])
+    if current != last:
+        gov.set_limits(**dict(zip(_LIMIT_KEYS, current)))
+    return current
+
+
+def _follow_limits(gov: Governor, done: threading.Event, last: tuple) -> None:
+    """Thread de cada processo: aplica os limites que o pai for mudando."""
+    while not done.wait(0.2):
+        last = _apply_shared_limits(gov, last)
+
+
+def _archive_groups(
+    archives: Iterable[FileRecord], base_src: Path, preserve_structure: bool
+) -> list[list[FileRecord]]:
+    """Arquivos que podem escrever na mesma pasta de destino, pela ordem do scan.
+
+    Sem ``preserve_structure`` todos escrevem nas pastas das extensões: um só
+    grupo. Com ela, um arquivo da pasta ``a`` escreve em ``<ext>/a/...``,
+    incluindo subpastas vindas de dentro do arquivo: fica no grupo da pasta
+    ascendente mais alta que também tenha arquivos.
+    """
+    if not preserve_structure:
+        archives = list(archives)
+        return [archives] if archives else []
+    records = list(archives)
+    folders = sorted({rec.path.parent.relative_to(base_src).parts for rec in records})
+    root_of: dict[tuple, tuple] = {}
+    for parts in folders:
+        root_of[parts] = next((root_of[parts[:i]] for i in range(len(parts)) if parts[:i] in root_of), parts)
+    groups: dict[tuple, list[FileRecord]] = {}
+    for rec in records:
+        groups.setdefault(root_of[rec.path.parent.relative_to(base_src).parts], []).append(rec)
+    return list(groups.values())
+
+
+def _archive_stats(resume: bool) -> dict:
+    """Contadores que ``_extract_archive`` atualiza, para somar aos do pai."""
+    stats = dict(
+        files_copied=0,
+        mb_copied=0.0,
+        ext_counts={},
+        ext_sizes={},
+        ext_from_archives={},
+        copy_strategies={},
+        durability={"fsyncs": 0, "checkpoints": 0},
+        dest_dirs_indexed=0,
+        dirs_created=0,
+        partials_swept=0,
+    )
+    if resume:
+        stats["resume"] = {"skipped": 0, "mb_skipped": 0.0}
+    return stats
+
+
+def _merge_stats(into: dict, part: dict) -> None:
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _merge_stats(into.setdefault(key, {}), value)
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def _extract_archive_group(job: _ArchiveJob) -> dict:
+    """Corre num processo do pool: extrai os arquivos de ``job`` e devolve o resultado."""
+    stop = _archive_cancel.is_set if _archive_cancel is not None else (lambda: False)
+    logs: list[str] = []
+    recorder = _ArchiveRecorder(job.base_dst, job.algo, job.journal_entries)
+    gov = Governor(stop_flag=stop) if job.governed else None
+    done = threading.Event()
+    if gov:
+        last = _apply_shared_limits(gov, None)
+        threading.Thread(target=_follow_limits, args=(gov, done, last), daemon=True).start()
+    sync = Durability(job.durability, job.base_dst)
+    ctx = _CopyContext(
+        base_src=job.base_src,
+        base_dst=job.base_dst,
+        preserve_structure=job.preserve_structure,
+        stats=_archive_stats(job.journal_entries is not None),
+        log=logs.append,
+        progress_cb=None,
+        total=_TotalTracker(None),
+        stop_flag=stop,
+        strategies=_CopyStrategies(None, policy=IOPolicy(job.io_policy, job.cache_hints), governor=gov),
+        durability=sync,
+        manifest=recorder if job.algo else None,
+        journal=recorder if job.journal_entries is not None else None,
+        governor=gov,
+        # os .part destas pastas podem ser de outro processo: o pai já as limpou
+        dest_index=DestIndex(sweep_partials=False),
+    )
+    try:
+        for rec in job.records:
+            if stop():
+                break
+            _extract_archive(ctx, rec, job.extensions)
+    finally:
+        done.set()
+        # os dados ficam em disco antes de o pai gravar o diário
+        sync.close()
+    st = ctx.stats
+    st["durability"].update(fsyncs=sync.fsyncs, checkpoints=sync.checkpoints)
+    st["dest_dirs_indexed"] = ctx.dest_index.dirs_loaded
+    st["dirs_created"] = ctx.dirs.created
+    st["partials_swept"] = ctx.dest_index.partials_swept
+    return {"stats": st, "logs": logs, "recorder": recorder, "total": ctx.total.value, "processed": ctx.processed}
+
+
+def _extract_archives_in_pool(
+    ctx: _CopyContext,
+    groups: list[list[FileRecord]],
+    extensions: Iterable[str],
+    workers: int,
+    job_args: dict,
+) -> None:
+    """Fase 2 num pool de processos, um processo por grupo de ``_archive_groups``.
+
+    Grupos diferentes nunca escrevem na mesma pasta de destino, e cada
+    processo tem o seu ``DestIndex``, sem limpeza de ``.part`` (podiam ser
+    escritas em curso de outro processo): os ``.part`` antigos das árvores
+    de destino são apagados aqui, uma vez, antes do pool. Os resultados são
+    fundidos pela ordem de submissão, para estatísticas e log não dependerem
+    de qual processo acaba primeiro. O cancelamento chega aos processos por
+    um ``multiprocessing.Event`` e os limites do ``governor`` por um
+    ``multiprocessing.Array``, repartidos pelos processos e revistos a cada
+    0,2 s (``governor.set_limits`` continua a valer durante o pool).
+    """
+    extensions = list(extensions)
+    for recs in groups:
+        rel = recs[0].path.parent.relative_to(ctx.base_src)
+        for ext in dict.fromkeys(e.lower().lstrip(".") for e in extensions):
+            ctx.stats["partials_swept"] += sweep_partials(ctx.base_dst / ext / rel)
+    journal = ctx.journal
+    jobs = [
+        _ArchiveJob(
+            records=recs,
+            extensions=extensions,
+            journal_entries=(
+                {k: e for rec in recs for k, e in journal.entries(ctx.source_key(rec.path, "")).items()}
+                if journal
+                else None
+            ),
+            governed=ctx.governor is not None,
+            **job_args,
+        )
+        for recs in groups
+    ]
+    workers = min(workers, len(jobs))
+    mp = mp_context()
+    cancel = mp.Event()
+    shared = mp.Array("d", len(_LIMIT_KEYS))
+    limits = _share_limits(shared, ctx.governor, workers) if ctx.governor else None
+    with ProcessPoolExecutor(
+        workers, mp_context=mp, initializer=_init_archive_worker, initargs=(cancel, shared)
+    ) as pool:
+        futures = [pool.submit(_extract_archive_group, job) for job in jobs]
+        for job, fut in zip(jobs, futures):
+            while not wait([fut], timeout=0.2).done:
+                if ctx.stop_flag() and not cancel.is_set():
+                    cancel.set()
+                    for f in futures:
+                        f.cancel()
+                if ctx.governor and ctx.governor.limits() != limits:
+                    limits = _share_limits(shared, ctx.governor, workers)
+            if fut.cancelled():
+                continue
+            try:
+                result = fut.result()
+            except Exception as e:
+                _emit(ctx.log, f"❌ Erro ao extrair {job.records[0].path.parent}: {e}")
+                continue
+            ctx.total.add(result["total"])
+            with ctx.lock:
+                _merge_stats(ctx.stats, result["stats"])
+            for msg in result["logs"]:
+                _emit(ctx.log, msg)
+            result["recorder"].replay(ctx.manifest, journal)
+            ctx.advance(result["processed"])
 
 
 def copy_selected(
@@ -73,26 +1240,138 @@ def copy_selected(
     archive_types: set[str] | None = None,
     use_vss: bool = False,
     progress_cb: Optional[Callable[[int], None]] = None,
+    total_cb: Optional[Callable[[int], None]] = None,
     log_cb: Optional[Callable[[str], None]] = None,
     stop_flag: Optional[Callable[[], bool]] = None,
     stats: Optional[dict] = None,
     secure_logging: bool = True,  # SEGURANÇA: Ofuscar caminhos por padrão
+    workers: int = 1,
+    allow_hardlinks: bool = False,
+    durability: str = "per-file",
+    hash_algo: str | None = None,
+    hash_cache: bool = False,
+    materialize_dirs: bool = False,
+    blob_store: bool = False,
+    resume: bool = False,
+    io_policy: str = "adaptive",
+    cache_hints: bool = True,
+    range_workers: int = 1,
+    range_threshold: int = _RANGE_THRESHOLD,
+    pack_small: str | None = None,
+    pack_threshold: int = 64 * 1024,
+    compress: str | None = None,
+    compress_level: int | None = None,
+    compress_workers: int | None = None,
+    compress_skip: set[str] | None = None,
+    governor: Governor | None = None,
+    archive_workers: int = 1,
 ) -> None:
     """
     Executa o backup seletivo. Se VSS falhar, continua sem VSS.
     
     Args:
+        total_cb: Recebe o total de itens conhecido até ao momento; cresce à
+            medida que o scan avança e que os arquivos são abertos
         secure_logging: Se True (padrão), ofusca caminhos completos nos logs
+        workers: Número de threads de cópia. Com 1 (padrão) tudo corre em
+            série; acima disso o scan alimenta um pool limitado, com o mesmo
+            resultado no destino
+        allow_hardlinks: Se True, ficheiros no mesmo sistema de ficheiros do
+            destino são ligados por hardlink em vez de copiados (partilham os
+            dados com a origem: alterar um altera o outro)
+        durability: ``none``, ``per-file`` (padrão), ``batched`` ou
+            ``end-of-run``; garantias de cada nível em ``core.durability``
+        hash_algo: Se definido (ex. ``sha256``, ``blake2b``), calcula o digest
+            de cada ficheiro na mesma leitura da cópia e grava-o no manifesto
+            da execução (``backup_manifest_<data>_<hora>.jsonl`` no destino)
+        hash_cache: Se True, guarda os digests de origem e destino numa cache
+            SQLite na raiz do destino (``core.hash_cache``) e reutiliza-os nas
+            execuções seguintes enquanto tamanho/mtime/inode não mudarem
+        materialize_dirs: Se True, termina o scan antes de copiar (o plano
+            fica em memória) e cria todo o esqueleto de pastas do destino de
+            uma vez; o total de itens fica conhecido antes da cópia
+        blob_store: Se True, o destino é endereçado por conteúdo: cada conteúdo
+            distinto é guardado uma vez em ``objects/`` e a árvore por extensão
+            é feita de hardlinks para esses blobs (ver ``core.blobstore``)
+        resume: Se True, regista os itens concluídos num diário no destino
+            (``core.journal``) e salta os que uma execução anterior, mesmo
+            interrompida, já deixou concluídos
+        io_policy: ``adaptive`` (padrão: buffer à medida do ficheiro e do
+            tipo de disco) ou ``fixed``; ver ``core.iopolicy``
+        cache_hints: Se True (padrão), pede read-ahead sequencial e liberta
+            da cache do SO os ficheiros já copiados (``posix_fadvise``)
+        range_workers: Com 2 ou mais, ficheiros a partir de ``range_threshold``
+            bytes (1 GiB por omissão) são copiados em intervalos de 64 MiB por
+            este número de threads; o manifesto guarda então o digest por
+            intervalos (``hasher.range_algo``)
+        pack_small: ``zip``, ``zip-deflate`` ou ``tar``: ficheiros com menos
+            de ``pack_threshold`` bytes são acrescentados a segmentos por
+            extensão em ``packs/`` com um índice consultável, em vez de um
+            ficheiro cada (ver ``core.packer``); não combina com ``blob_store``
+        compress: ``zlib``, ``bz2`` ou ``lzma``: grava comprimidos (``.gz``,
+            ``.bz2``, ``.xz``) os ficheiros que o tipo e uma amostra do
+            primeiro bloco indiquem compressíveis, num pool de
+            ``compress_workers`` processos (por omissão um por CPU; as threads
+            de cópia sobem para o mesmo número). ``compress_skip`` substitui a
+            lista de extensões já comprimidas (``core.compress.SKIP_EXTS``).
+            Não combina com ``blob_store``
+        governor: ``core.governor.Governor`` com limites de leitura/escrita
+            (bytes/s) e ficheiros/s, e prioridade de CPU/I/O; os limites podem
+            ser mudados durante a execução com ``governor.set_limits`` e o
+            tempo de espera fica em ``stats["governor"]``
+        archive_workers: Com 2 ou mais, os arquivos (fase 2) são extraídos
+            num pool deste número de processos; arquivos que podem escrever
+            na mesma pasta de destino ficam no mesmo processo (sem
+            ``preserve_structure`` são todos, e a extração fica em série).
+            As estatísticas são fundidas pela ordem do scan. Os limites do
+            ``governor`` são repartidos pelos processos e as mudanças chegam
+            a eles durante a extração. Não combina com ``blob_store``
     """
     base_src = Path(src)
     base_dst = Path(dst)
     base_dst.mkdir(parents=True, exist_ok=True)
+    if pack_small and blob_store:
+        raise ValueError("pack_small e blob_store são modos de destino alternativos")
+    if compress and blob_store:
+        raise ValueError("compress e blob_store são modos de destino alternativos")
+    if archive_workers > 1 and blob_store:
+        raise ValueError("archive_workers e blob_store não combinam: os blobs são de um só processo")
+    compressor = Compressor(compress, compress_level, compress_workers, compress_skip) if compress else None
+    if compressor:
+        # as threads só esperam pelos processos: uma por processo chega
+        workers = max(workers, compressor.workers)
+    sync = Durability(durability, base_dst)
+    policy = IOPolicy(io_policy, cache_hints)  # valida o nome antes de começar
+    if hash_algo:
+        new_hasher(hash_algo)  # valida o nome antes de começar
+    manifest = RunManifest(base_src, base_dst, hash_algo) if hash_algo else None
+    cache = HashCache(base_dst) if hash_cache else None
+    blobs = BlobStore(base_dst, hash_algo or "sha256", policy) if blob_store else None
+    packer = (
+        SegmentPacker(base_dst, pack_small, pack_threshold, algo=hash_algo or "sha256", on_closed=sync.file_written)
+        if pack_small
+        else None
+    )
+    # opções que mudam o destino de cada item: com outras, o diário não serve
+    journal_options = dict(
+        preserve_structure=preserve_structure, blob_store=blob_store, pack_small=pack_small, compress=compress
+    )
+    journal = (
+        ResumeJournal(base_dst, deferred=durability in ("batched", "end-of-run"), options=journal_options)
+        if resume
+        else None
+    )
+    if journal:
+        sync.add_checkpoint_hook(journal.prepare_checkpoint)
     
     # SEGURANÇA: Criar callback de log seguro que ofusca caminhos
     if secure_logging and log_cb:
         secure_log_cb = create_secure_log_callback(log_cb, base_src, base_dst)
     else:
         secure_log_cb = log_cb
+    if journal and journal.discarded:
+        _emit(secure_log_cb, f"ℹ️ Opções diferentes da execução anterior: diário de retoma recomeçado "
+                             f"({journal.discarded} itens descartados).")
 
     if stats is None:
         stats = {}
@@ -106,11 +1385,36 @@ def copy_selected(
         ext_counts={},
         ext_sizes={},
         ext_from_archives={},
+        copy_strategies={},
+        compare={"tiers": {}, "bytes_read": 0, "bytes_saved": 0},
+        dest_dirs_indexed=0,
+        dirs_created=0,
+        partials_swept=0,
+        blob_store=None,
+        packs=None,
+        compression=(
+            {"codec": compress, "files": 0, "skipped": 0, "bytes_in": 0, "bytes_out": 0,
+             "ext_bytes": {}, "ext_ratios": {}}
+            if compressor
+            else None
+        ),
+        governor=None,
+        resume={"skipped": 0, "mb_skipped": 0.0, "journal_entries": journal.loaded} if journal else None,
+        durability={"level": durability, "fsyncs": 0, "checkpoints": 0},
+        manifest=str(manifest.path) if manifest else None,
+        hash_cache={"hits": 0, "misses": 0, "evicted": 0, "pruned": 0} if cache else None,
         vss={"requested": use_vss, "success": False, "reason": None},
     )
 
     if stop_flag is None:
         stop_flag = lambda: False  # noqa: E731
+    if governor:
+        # o cancelamento interrompe as esperas
+        governor.stop_flag = stop_flag
+        # antes de criar threads e processos, que herdam a prioridade
+        applied = governor.apply_priority()
+        if applied:
+            _emit(secure_log_cb, f"🐢 Prioridade reduzida: {applied}")
 
     # --- Tentar VSS (Windows) ---
     snap: Optional[VssSnapshot] = None
@@ -127,119 +1431,159 @@ def copy_selected(
             stats["vss"]["reason"] = "VSS não disponível neste sistema"
             _emit(secure_log_cb, "ℹ️ VSS não disponível neste sistema; a continuar sem VSS.")
 
-    def scan_source() -> Iterable[Path]:
-        return scan(root=base_src, extensions=extensions, recursive=recursive, log_cb=secure_log_cb)
+    # Uma só travessia: ficheiros pretendidos e arquivos saem do mesmo scan
+    # e seguem para filas de processamento separadas.
+    wanted_exts = {e.lower().lstrip(".") for e in extensions}
+    arch_sufs = archive_suffixes(archive_types) if include_archives else ()
+
+    def scan_source() -> Iterable[tuple[FileRecord, bool, bool]]:
+        for rec in scan_records(
+            root=base_src,
+            extensions=extensions,
+            recursive=recursive,
+            archives=include_archives,
+            arch_types=archive_types,
+            log_cb=secure_log_cb,
+        ):
+            name = rec.path.name.lower()
+            is_wanted = os.path.splitext(name)[1].lstrip(".") in wanted_exts
+            yield rec, is_wanted, bool(arch_sufs) and name.endswith(arch_sufs)
+
+    def on_scanned(item: tuple[FileRecord, bool, bool]) -> None:
+        if item[1]:
+            total.add()
+
+    def planned(items: Iterable[tuple[FileRecord, bool, bool]]) -> Iterator[tuple[FileRecord, Path, str]]:
+        # arquivos seguem para a sua fila; ficheiros pretendidos ganham destino
+        for rec, is_wanted, is_arch in items:
+            if is_arch:
+                archive_queue.append(rec)
+            if is_wanted:
+                ext_folder = rec.path.suffix.lstrip(".").lower() or "_sem_ext"
+                yield rec, _dst_from_src(rec.path, base_src, base_dst, preserve_structure, ext_folder), ext_folder
+
+    total = _TotalTracker(total_cb)
+    archive_queue: deque[FileRecord] = deque()
+    ctx = _CopyContext(
+        base_src=base_src,
+        base_dst=base_dst,
+        preserve_structure=preserve_structure,
+        stats=stats,
+        log=secure_log_cb,
+        progress_cb=progress_cb,
+        total=total,
+        stop_flag=stop_flag,
+        strategies=_CopyStrategies(
+            os.stat(base_dst).st_dev, allow_hardlinks, policy, range_workers, range_threshold,
+            governor=governor,
+        ),
+        durability=sync,
+        manifest=manifest,
+        hash_cache=cache,
+        blobs=blobs,
+        journal=journal,
+        packer=packer,
+        compressor=compressor,
+        governor=governor,
+    )
 
     try:
-        processed = 0
         # --- Fase 1: scan + cópia de ficheiros normais ---
-        for path in scan_source():
-            if stop_flag():
-                _emit(secure_log_cb, "⏹️  Operação cancelada.")
-                break
+        pool = _CopyPool(workers) if workers > 1 else None
+        try:
+            jobs: Iterable[tuple[FileRecord, Path, str]] = planned(
+                _scan_ahead(scan_source(), stop_flag, on_item=on_scanned)
+            )
+            if materialize_dirs:
+                jobs = list(jobs)
+                total.flush()
+                ctx.dirs.materialize({dst_path.parent for rec, dst_path, _ in jobs if not ctx.packs(rec)})
+                _emit(secure_log_cb, f"📁 Estrutura de destino criada ({ctx.dirs.created} pastas novas).")
 
-            stats["files_scanned"] += 1
-            try:
-                size_mb = (path.stat().st_size or 0) / (1024 * 1024)
-                stats["mb_scanned"] += size_mb
-            except Exception:
-                pass
+            for rec, dst_path, ext_folder in jobs:
+                if stop_flag():
+                    _emit(secure_log_cb, "⏹️  Operação cancelada.")
+                    break
 
-            # Encontrado ficheiro com extensão pretendida
-            stats["files_found"] += 1
-            ext_folder = path.suffix.lstrip(".").lower() or "_sem_ext"
-            dst_path = _dst_from_src(path, base_src, base_dst, preserve_structure, ext_folder)
-            try:
-                copy_this = True
-                if dst_path.exists():
-                    try:
-                        if file_hash(path) == file_hash(dst_path):
-                            _emit(secure_log_cb, f"⚖️  Já existe igual: {dst_path}")
-                            copy_this = False
-                        else:
-                            dst_path = _resolve_conflict(dst_path)
-                            _emit(secure_log_cb, f"➕  Ficheiro semelhante, a guardar como {dst_path.name}")
-                    except Exception as e:
-                        _emit(secure_log_cb, f"❌ Erro ao comparar {path} com {dst_path}: {e}")
-                        dst_path = _resolve_conflict(dst_path)
-
-                if copy_this:
-                    _ensure_dir(dst_path)
-                    shutil.copy2(path, dst_path)
-                    try:
-                        with open(dst_path, "rb") as fh:
-                            fh.flush()
-                            os.fsync(fh.fileno())
-                    except Exception:
-                        pass
-                    stats["files_copied"] += 1
-                    copied_mb = 0.0
-                    try:
-                        copied_mb = (dst_path.stat().st_size or 0) / (1024 * 1024)
-                        stats["mb_copied"] += copied_mb
-                    except Exception:
-                        pass
-                    stats["ext_counts"][ext_folder] = stats["ext_counts"].get(ext_folder, 0) + 1
-                    stats["ext_sizes"][ext_folder] = stats["ext_sizes"].get(ext_folder, 0.0) + copied_mb
-                    _emit(secure_log_cb, f"✔ Copiado: {path} -> {dst_path}")
-            except PermissionError as e:
-                stats["files_denied"] += 1
-                _emit(secure_log_cb, f"⚠️  Sem acesso: {path} ({e})")
-            except Exception as e:
-                _emit(secure_log_cb, f"❌ Erro ao copiar {path}: {e}")
+                # Encontrado ficheiro com extensão pretendida
+                ctx.bump(files_scanned=1, files_found=1, mb_scanned=rec.size / _MB)
+                if journal and journal.completed(ctx.source_key(rec.path), rec.size, rec.mtime_ns):
+                    ctx.count_resumed(rec.size)
+                    ctx.advance()
+                    continue
+                # pastas criadas aqui, nunca pelas threads de cópia
+                if not ctx.packs(rec):
+                    ctx.dirs.ensure(dst_path.parent)
+                if pool:
+                    pool.submit(_conflict_key(dst_path), _copy_file, ctx, rec, dst_path, ext_folder)
+                else:
+                    _copy_file(ctx, rec, dst_path, ext_folder)
+        finally:
+            if pool:
+                pool.close(cancel=stop_flag())
+            if compressor:
+                compressor.close(cancel=stop_flag())
 
-            processed += 1
-            _progress(progress_cb, processed)
+        total.flush()
 
         # --- Fase 2: processar arquivos (zip/rar/7z/tar) se pedido ---
         if include_archives:
             _emit(secure_log_cb, "— A procurar dentro de ficheiros compactados…")
-            for path in scan(
-                root=base_src,
-                extensions=archive_types or set(),
-                recursive=recursive,
-                log_cb=secure_log_cb,
-                treat_missing_as_warning=True,
-            ):
+            groups = _archive_groups(archive_queue, ctx.base_src, preserve_structure) if archive_workers > 1 else []
+            # com um só grupo (por exemplo sem preserve_structure) fica tudo em série
+            if len(groups) > 1 and not stop_flag():
+                job_args = dict(
+                    base_src=base_src,
+                    base_dst=base_dst,
+                    preserve_structure=preserve_structure,
+                    durability=durability,
+                    io_policy=io_policy,
+                    cache_hints=cache_hints,
+                    algo=manifest.algo if manifest else None,
+                )
+                _extract_archives_in_pool(ctx, groups, extensions, archive_workers, job_args)
+                archive_queue.clear()
+            while archive_queue:
+                arch = archive_queue.popleft()
                 if stop_flag():
                     break
-                if not is_archive(path, archive_types):
-                    continue
-                try:
-                    for inner_name, stream in iterate_archive(path, extensions):
-                        # Monta destino: pasta = extensão do ficheiro interno
-                        inner_ext = Path(inner_name).suffix.lstrip(".").lower() or "_sem_ext"
-                        dst_path = _dst_from_src(
-                            path.parent / inner_name,
-                            base_src,
-                            base_dst,
-                            preserve_structure,
-                            inner_ext,
-                        )
-                        _ensure_dir(dst_path)
-                        with open(dst_path, "wb") as fh:
-                            shutil.copyfileobj(stream, fh)
-                            try:
-                                fh.flush()
-                                os.fsync(fh.fileno())
-                            except Exception:
-                                pass
-                        stats["files_copied"] += 1
-                        copied_mb = 0.0
-                        try:
-                            copied_mb = (dst_path.stat().st_size or 0) / (1024 * 1024)
-                            stats["mb_copied"] += copied_mb
-                        except Exception:
-                            pass
-                        stats["ext_counts"][inner_ext] = stats["ext_counts"].get(inner_ext, 0) + 1
-                        stats["ext_sizes"][inner_ext] = stats["ext_sizes"].get(inner_ext, 0.0) + copied_mb
-                        stats["ext_from_archives"][inner_ext] = (
-                            stats["ext_from_archives"].get(inner_ext, 0) + 1
-                        )
-                        _emit(secure_log_cb, f"✔ Extraído: {path}!{inner_name} -> {dst_path}")
-                        processed += 1
-                        _progress(progress_cb, processed)
-                except Exception as e:
-                    _emit(secure_log_cb, f"❌ Erro ao extrair {path}: {e}")
+                _extract_archive(ctx, arch, extensions)
     finally:
-        delete_snapshot(snap, log_cb=secure_log_cb)
+        try:
+            try:
+                if manifest:
+                    manifest.close()
+                if blobs:
+                    blobs.close()
+                    stats["blob_store"] = blobs.stats()
+                if packer:
+                    packer.close()
+                    stats["packs"] = {
+                        "files": packer.files,
+                        "bytes": packer.bytes,
+                        "segments": packer.segments,
+                        "index": str(packer.root / INDEX_NAME),
+                    }
+                if cache:
+                    pruned = cache.close()
+                    stats["hash_cache"].update(
+                        hits=cache.hits, misses=cache.misses, evicted=cache.evicted, pruned=pruned
+                    )
+                ctx.strategies.close()
+                sync.close()
+                if journal:
+                    # só depois do sync: o diário não pode adiantar-se aos dados
+                    stats["resume"]["journal_entries"] = journal.close(complete=not stop_flag())
+            finally:
+                # += : os processos de arquivos já somaram os seus
+                stats["durability"]["fsyncs"] += sync.fsyncs
+                stats["durability"]["checkpoints"] += sync.checkpoints
+            if governor:
+                stats["governor"] = governor.stats()
+            stats["dest_dirs_indexed"] += ctx.dest_index.dirs_loaded
+            stats["dirs_created"] += ctx.dirs.created
+            stats["partials_swept"] += ctx.dest_index.partials_swept + (blobs.swept if blobs else 0)
+            total.flush(force=True)
+        finally:
+            # o snapshot é sempre libertado, mesmo se o fecho acima falhar
+            delete_snapshot(snap, log_cb=secure_log_cb)
@@ -0,0 +1,106 @@
+"""Índice em memória dos nomes já existentes nas pastas de destino.
+
+Substitui as sondagens ``Path.exists()`` por ficheiro e o ciclo
+``foo_1``, ``foo_2``, … da resolução de conflitos: cada pasta é lida uma
+única vez (um ``scandir``, na primeira vez que é precisa), o índice é
+atualizado à medida que o backup escreve, e o próximo sufixo livre de cada
+nome fica memorizado.
+
+Ao listar uma pasta pela primeira vez, os temporários ``.part`` deixados por
+uma escrita interrompida (ver ``core.atomic``) são apagados. Quando outros
+processos escrevem nas mesmas pastas, esses ``.part`` podem ser escritas em
+curso: o índice é criado com ``sweep_partials=False`` e quem os lança limpa
+antes as árvores de destino com :func:`sweep_partials`.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+from .atomic import is_partial
+
+
+class DestIndex:
+    """Nomes por pasta de destino, carregados à medida (thread-safe).
+
+    A comparação de nomes usa ``os.path.normcase``: em Windows ``FOTO.jpg``
+    e ``foto.JPG`` são o mesmo ficheiro, como para o sistema de ficheiros.
+    """
+
+    def __init__(self, sweep_partials: bool = True) -> None:
+        self.sweep_partials = sweep_partials
+        self._dirs: dict[str, set[str]] = {}
+        self._next: dict[tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+        self.dirs_loaded = 0
+        self.partials_swept = 0
+
+    def exists(self, path: Path) -> bool:
+        with self._lock:
+            return os.path.normcase(path.name) in self._names_locked(path.parent)
+
+    def add(self, path: Path) -> None:
+        """Regista um nome escrito (ou prestes a ser escrito) pelo backup."""
+        with self._lock:
+            self._names_locked(path.parent).add(os.path.normcase(path.name))
+
+    def add_dir(self, parent: Path) -> None:
+        """Marca ``parent`` como pasta acabada de criar (vazia), sem a listar."""
+        with self._lock:
+            self._dirs.setdefault(os.fspath(parent), set())
+
+    def resolve_conflict(self, path: Path) -> Path:
+        """Primeiro ``<nome>_<n><ext>`` livre (n = 1, 2, …) se ``path`` já existir."""
+        stem, suffix = path.stem, path.suffix
+        with self._lock:
+            names = self._names_locked(path.parent)
+            if os.path.normcase(path.name) not in names:
+                return path
+            key = (os.fspath(path.parent), os.path.normcase(stem), os.path.normcase(suffix))
+            counter = self._next.get(key, 1)
+            while os.path.normcase(f"{stem}_{counter}{suffix}") in names:
+                counter += 1
+            # os nomes só são acrescentados durante a execução: os anteriores
+            # continuam ocupados e a próxima procura começa aqui
+            self._next[key] = counter
+            return path.with_name(f"{stem}_{counter}{suffix}")
+
+    def _names_locked(self, parent: Path) -> set[str]:
+        key = os.fspath(parent)
+        names = self._dirs.get(key)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(key) as it:
+                    for entry in it:
+                        if is_partial(entry.name):
+                            if not self.sweep_partials:
+                                continue
+                            if _unlink(entry.path):
+                                self.partials_swept += 1
+                                continue
+                        names.add(os.path.normcase(entry.name))
+            except (FileNotFoundError, NotADirectoryError):
+                pass
+            self._dirs[key] = names
+            self.dirs_loaded += 1
+        return names
+
+
+def sweep_partials(root: Path) -> int:
+    """Apaga os ``.part`` de toda a árvore ``root``; devolve quantos apagou."""
+    swept = 0
+    for folder, _dirs, files in os.walk(root):
+        for name in files:
+            if is_partial(name) and _unlink(os.path.join(folder, name)):
+                swept += 1
+    return swept
+
+
+def _unlink(path: str) -> bool:
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
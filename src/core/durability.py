@@ -0,0 +1,167 @@
+"""Níveis de durabilidade da escrita no destino.
+
+Garantias em caso de crash ou falha de energia a meio do backup:
+
+``none``
+    Nenhuma. O SO escreve quando entender; ficheiros recentes podem ficar
+    vazios ou truncados mesmo que o log os dê como copiados.
+``per-file``
+    Cada ficheiro dado como copiado tem os dados em disco (``fsync`` do
+    descritor antes de fechar). É o comportamento histórico e o mais lento em
+    discos USB/rotativos. Em Windows o descritor tem de ter acesso de escrita:
+    ``FlushFileBuffers`` falha num só de leitura.
+``batched``
+    Checkpoints a cada ``batch_files`` ficheiros ou ``batch_bytes`` bytes: em
+    Linux um ``syncfs`` ao sistema de ficheiros do destino, noutros POSIX o
+    ``fsync`` dos descritores do lote. Em Windows cada ficheiro tem ``fsync``
+    antes de fechar (um ficheiro aberto não pode ser renomeado, ver
+    ``core.atomic``) e só o diário fica agrupado. Tudo o que foi escrito até
+    ao último checkpoint está em disco; perde-se no máximo o lote em curso.
+``end-of-run``
+    Uma única sincronização no fim. Um crash a meio pode deixar qualquer
+    ficheiro desta execução incompleto; um backup que termina está em disco.
+"""
+from __future__ import annotations
+
+import ctypes
+import os
+import stat
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+LEVELS = ("none", "per-file", "batched", "end-of-run")
+# em Windows uma cópia aberta do descritor impede o rename do temporário
+_DUP_FDS = os.name != "nt"
+
+
+def _load_syncfs() -> Optional[Callable[[int], int]]:
+    """``syncfs(2)`` via libc (o módulo ``os`` não o expõe)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        fn = ctypes.CDLL(None, use_errno=True).syncfs
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+class Durability:
+    """Aplica um dos ``LEVELS`` aos ficheiros escritos no destino (thread-safe)."""
+
+    def __init__(
+        self,
+        level: str,
+        root: Path,
+        batch_files: int = 256,
+        batch_bytes: int = 256 * 1024 * 1024,
+    ):
+        if level not in LEVELS:
+            raise ValueError(f"Nível de durabilidade inválido: {level!r}. Opções: {', '.join(LEVELS)}")
+        self.level = level
+        self.root = Path(root)
+        self.batch_files = batch_files
+        self.batch_bytes = batch_bytes
+        self.fsyncs = 0
+        self.checkpoints = 0
+        self._syncfs = _load_syncfs()
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._pending_fds: list[int] = []
+        self._pending_paths: list[Path] = []
+        self._files = 0
+        self._bytes = 0
+        self._hooks: list[Callable[[], Callable[[], None]]] = []
+
+    def add_checkpoint_hook(self, prepare: Callable[[], Callable[[], None]]) -> None:
+        """Regista ``prepare``: chamado antes de cada checkpoint, devolve a
+        função a chamar depois de os dados estarem em disco."""
+        self._hooks.append(prepare)
+
+    def file_written(self, fd: int, path: Path, nbytes: int) -> None:
+        """Chamado com o descritor ainda aberto, depois de escritos os dados."""
+        if self.level == "none":
+            return
+        if self.level == "per-file":
+            self._fsync(fd)
+            return
+        if self.level == "batched" and self._syncfs is None and not _DUP_FDS:
+            self._fsync(fd)
+
+        with self._lock:
+            if self._syncfs is None:
+                if self.level == "batched":
+                    if _DUP_FDS:
+                        # guarda uma cópia do descritor para o fsync do lote
+                        self._pending_fds.append(os.dup(fd))
+                else:
+                    self._pending_paths.append(path)
+            self._files += 1
+            self._bytes += nbytes
+            if self.level == "batched" and (
+                self._files >= self.batch_files or self._bytes >= self.batch_bytes
+            ):
+                self._checkpoint_locked()
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            self._checkpoint_locked()
+
+    def close(self) -> None:
+        """Sincroniza o que estiver pendente (fim do backup ou cancelamento)."""
+        if self.level in ("batched", "end-of-run"):
+            self.checkpoint()
+
+    def _checkpoint_locked(self) -> None:
+        if not self._files:
+            return
+        # o que os hooks preparam agora refere-se a dados já escritos
+        commits = [prepare() for prepare in self._hooks]
+        if self._syncfs is not None:
+            fd = os.open(self.root, os.O_RDONLY)
+            try:
+                self._syncfs(fd)
+            finally:
+                os.close(fd)
+        else:
+            for fd in self._pending_fds:
+                try:
+                    self._fsync(fd)
+                finally:
+                    os.close(fd)
+            for path in self._pending_paths:
+                self._fsync_path(path)
+        self._pending_fds.clear()
+        self._pending_paths.clear()
+        self._files = 0
+        self._bytes = 0
+        self.checkpoints += 1
+        for commit in commits:
+            commit()
+
+    def _fsync_path(self, path: Path) -> None:
+        """``fsync`` por caminho, aberto para escrita (ver ``per-file``)."""
+        try:
+            mode = os.stat(path).st_mode
+            # ficheiro só de leitura (copystat da origem): escrita só para o fsync
+            if not mode & stat.S_IWRITE:
+                os.chmod(path, mode | stat.S_IWRITE)
+            try:
+                with open(path, "r+b") as fh:
+                    self._fsync(fh.fileno())
+            finally:
+                if not mode & stat.S_IWRITE:
+                    os.chmod(path, mode)
+        except OSError:
+            pass
+
+    def _fsync(self, fd: int) -> None:
+        try:
+            os.fsync(fd)
+        except OSError:
+            return
+        with self._count_lock:
+            self.fsyncs += 1
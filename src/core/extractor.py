@@ -1,7 +1,37 @@
 from pathlib import Path
-from typing import Iterable, Iterator, Tuple
-import io, zipfile, tarfile
+from typing import BinaryIO, Iterable, Iterator, Tuple
+import zipfile, tarfile
+import io
 import os
+import queue
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+
+from .scanner import ARCH_MAP
+
+# ferramentas externas para RAR e os seus argumentos: uma só invocação extrai
+# todos os membros listados em {list} (UTF-8, um por linha) para {dest}
+# (unrar: -sc<charset><objetos>, f = UTF-8, l = ficheiros de lista)
+_RAR_TOOLS = {
+    "unrar": ["x", "-y", "-idq", "-p-", "-scfl", "{arc}", "@{list}", "{dest}/"],
+    "7z": ["x", "-y", "-bd", "-bso0", "-scsUTF-8", "-spd", "-o{dest}", "{arc}", "@{list}"],
+    "bsdtar": ["-x", "-f", "{arc}", "-C", "{dest}", "-T", "{list}"],
+}
+# as entradas da lista são padrões: o bsdtar aceita estes caracteres escapados
+# com "\"; o 7z com -spd não usa curingas; o unrar não tem escape, e um "*" ou
+# "?" no nome só extrai membros a mais, que não são entregues
+_RAR_ESCAPE = {"bsdtar": "\\*?["}
+
+# membros até este tamanho ficam em memória; acima vão para um temporário
+SPOOL_MAX = 8 * 1024 * 1024
+_COPY_CHUNK = 1024 * 1024
+# blocos de _COPY_CHUNK em trânsito entre a thread de extração do 7z e quem
+# lê os membros
+_PIPE_CHUNKS = 16
+_END = object()
 
 
 class PathTraversalError(Exception):
@@ -9,6 +39,11 @@ class PathTraversalError(Exception):
     pass
 
 
+class ArchiveBackendError(Exception):
+    """Falta (ou falhou) a biblioteca ou a ferramenta externa que lê um tipo de arquivo."""
+    pass
+
+
 def _validate_archive_member_path(member_name: str, archive_path: Path) -> str:
     """Valida se o caminho de um membro do arquivo é seguro contra Path Traversal.
     
@@ -81,18 +116,88 @@ def is_archive(path: Path, tipos: Iterable[str] | None = None) -> bool:
         suportadas |= {t.lower().lstrip(".") for t in tipos}
     return any(nome.endswith(f".{ext}") for ext in suportadas)
 
-def iterate_archive(path: Path, extensions: Iterable[str]) -> Iterator[Tuple[str, io.BufferedReader]]:
+def _archive_kind(path: Path) -> str | None:
+    """Tipo de arquivo (chave de ``ARCH_MAP``) pelo nome, com sufixos compostos."""
+    nome = path.name.lower()
+    for kind, sufixos in ARCH_MAP.items():
+        if nome.endswith(tuple(sufixos)):
+            return kind
+    return None
+
+
+def count_archive_members(path: Path, extensions: Iterable[str]) -> int | None:
+    """Conta os ficheiros internos pretendidos lendo só os cabeçalhos do arquivo.
+
+    Nenhum membro é descomprimido. Devolve ``None`` quando a contagem obrigaria
+    a descomprimir o arquivo inteiro (tar comprimido) ou quando os cabeçalhos
+    não podem ser lidos; nesse caso o total vai sendo conhecido à medida que
+    os membros são extraídos.
+    """
+    want = {e.lower().lstrip(".") for e in extensions}
+    kind = _archive_kind(path)
+
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(path) as z:
+                names = [i.filename for i in z.infolist() if not i.is_dir()]
+
+        elif kind == "tar" and path.name.lower().endswith(".tar"):
+            # tar sem compressão: os cabeçalhos lêem-se saltando os dados, um a
+            # um e sem guardar a lista de membros
+            names = []
+            with tarfile.open(path, "r:") as t:
+                while (m := t.next()) is not None:
+                    if m.isfile():
+                        names.append(m.name)
+                    t.members.clear()
+
+        elif kind == "rar":
+            import rarfile
+            with rarfile.RarFile(path) as r:
+                # os links simbólicos não são extraídos (ver iterate_archive)
+                names = [i.filename for i in r.infolist() if not i.isdir() and not i.is_symlink()]
+
+        elif kind == "7z":
+            import py7zr
+            with py7zr.SevenZipFile(path, mode="r") as z:
+                names = [
+                    i.filename for i in z.list() if not i.is_directory and not getattr(i, "is_symlink", False)
+                ]
+
+        else:
+            return None
+    except Exception:
+        return None
+
+    return sum(1 for n in names if Path(n).suffix.lower().lstrip(".") in want)
+
+
+def iterate_archive(
+    path: Path,
+    extensions: Iterable[str],
+    stream: bool = False,
+    buffer_size: int = SPOOL_MAX,
+) -> Iterator[Tuple[str, BinaryIO]]:
     """Gera (nome_relativo, stream) para cada ficheiro interno pretendido.
-    
+
+    Nenhum membro é carregado inteiro em memória. Por omissão cada membro é
+    entregue num ``SpooledTemporaryFile``: em memória até ``buffer_size``
+    bytes, em disco a partir daí, e válido depois de o gerador avançar. Com
+    ``stream=True`` o stream lê diretamente do arquivo, sem cópia
+    intermédia, e só é válido até ao membro seguinte. Em ambos os casos
+    ``member_size`` tem o tamanho descomprimido declarado no arquivo.
+    Os 7z são extraídos numa só passagem para um diretório temporário (os
+    membros pretendidos ocupam disco, não memória, até serem entregues).
+
     SEGURANÇA: Valida todos os caminhos internos para prevenir Path Traversal.
     
     Raises:
         PathTraversalError: Se algum arquivo interno tiver caminho malicioso
     """
     want = {e.lower().lstrip(".") for e in extensions}
-    suf  = path.suffix.lower()
+    kind = _archive_kind(path)
 
-    if suf == ".zip":
+    if kind == "zip":
         with zipfile.ZipFile(path) as z:
             for info in z.infolist():
                 if info.is_dir(): continue
@@ -100,50 +205,299 @@ def iterate_archive(path: Path, extensions: Iterable[str]) -> Iterator[Tuple[str
                 safe_name = _validate_archive_member_path(info.filename, path)
                 if Path(safe_name).suffix.lower().lstrip(".") in want:
                     with z.open(info) as f:
-                        yield safe_name, io.BytesIO(f.read())
+                        yield safe_name, _deliver(f, info.file_size, stream, buffer_size)
 
-    elif suf in {".tar", ".tgz", ".tar.gz", ".tbz2", ".tar.bz2"}:
-        with tarfile.open(path, "r:*") as t:
-            for m in t.getmembers():
+    elif kind == "tar":
+        # modo sequencial: cada tarball é lido e descomprimido uma só vez,
+        # sem getmembers() (que percorre tudo antes) nem seeks para trás
+        with tarfile.open(path, "r|*") as t:
+            while True:
+                m = t.next()
+                if m is None:
+                    break
+                # next() guarda cada cabeçalho em t.members: a lista não cresce
+                t.members.clear()
                 if not m.isfile(): continue
                 # SEGURANÇA: Validar caminho antes de processar
                 safe_name = _validate_archive_member_path(m.name, path)
                 if Path(safe_name).suffix.lower().lstrip(".") in want:
                     f = t.extractfile(m)
                     if f:
-                        yield safe_name, io.BytesIO(f.read())
+                        with f:
+                            yield safe_name, _deliver(f, m.size, stream, buffer_size)
 
-    elif suf == ".rar":
-        import rarfile            # pip install rarfile
+    elif kind == "rar":
+        try:
+            import rarfile        # pip install rarfile
+        except ImportError:
+            raise ArchiveBackendError("RAR ignorado: falta a biblioteca rarfile (pip install rarfile)")
+        # a lista lê-se dos cabeçalhos, sem ferramenta externa; a extração é
+        # uma só chamada à ferramenta (r.open lançaria uma por membro e, num
+        # RAR sólido, voltaria a descomprimir o arquivo desde o início)
+        wanted = {}
         with rarfile.RarFile(path) as r:
             for info in r.infolist():
+                # SEGURANÇA: links simbólicos apontariam para fora do arquivo
+                if info.isdir() or info.is_symlink(): continue
                 # SEGURANÇA: Validar caminho antes de processar
                 safe_name = _validate_archive_member_path(info.filename, path)
                 if Path(safe_name).suffix.lower().lstrip(".") in want:
-                    with r.open(info) as f:
-                        yield safe_name, io.BytesIO(f.read())
+                    wanted[info.filename] = (safe_name, info.file_size)
+        if wanted:
+            tools = (getattr(rarfile, "UNRAR_TOOL", "unrar"), *_RAR_TOOLS)
+            yield from _extract_rar_batch(path, wanted, tools, stream, buffer_size)
 
     # -------- 7-Zip --------------------------------------------------
-    elif suf == ".7z":
+    elif kind == "7z":
         try:
             import py7zr            # pip install py7zr
+            from py7zr.io import Py7zIO, WriterFactory
         except ImportError:
-            return                  # lib ausente → ignora este arquivo
-
-        with py7zr.SevenZipFile(path, mode="r") as z:
-            try:                                # versões < 1.0
-                for name, bio in z.readall().items():
-                    # SEGURANÇA: Validar caminho antes de processar
-                    safe_name = _validate_archive_member_path(name, path)
-                    if Path(safe_name).suffix.lower().lstrip(".") in want:
-                        yield safe_name, bio
-            except AttributeError:              # versões ≥ 1.0
-                for name in z.getnames():
-                    # SEGURANÇA: Validar caminho antes de processar
-                    safe_name = _validate_archive_member_path(name, path)
-                    if Path(safe_name).suffix.lower().lstrip(".") not in want:
-                        continue
-                    # read() devolve dict {nome: BytesIO}
-                    bio = z.read([name])[name]
-                    yield safe_name, bio
+            raise ArchiveBackendError("7z ignorado: falta a biblioteca py7zr >= 0.21 (pip install py7zr)")
+
+        # com um ficheiro aberto (e não o caminho) o py7zr descomprime numa só
+        # thread: os membros chegam um a seguir ao outro
+        with open(path, "rb") as fh, py7zr.SevenZipFile(fh, mode="r") as z:
+            # nomes pretendidos primeiro, depois uma única extração: num 7z
+            # sólido cada extração recomeça o bloco do início
+            wanted = {}
+            for info in z.list():
+                # SEGURANÇA: links simbólicos apontariam para fora do arquivo
+                if info.is_directory or getattr(info, "is_symlink", False): continue
+                # SEGURANÇA: Validar caminho antes de processar
+                safe_name = _validate_archive_member_path(info.filename, path)
+                if Path(safe_name).suffix.lower().lstrip(".") in want:
+                    wanted[info.filename] = (safe_name, getattr(info, "uncompressed", 0) or 0)
+            if wanted:
+                yield from _extract_7z_piped(z, wanted, Py7zIO, WriterFactory, stream, buffer_size)
+
+
+class _Cancelled(Exception):
+    """O consumidor deixou de ler: interrompe a extração na thread do py7zr."""
+
+
+class _PipeReader(io.RawIOBase):
+    """Um membro lido da fila preenchida pela thread de extração."""
+
+    def __init__(self, pipe: queue.Queue):
+        self._pipe = pipe
+        self._chunk = memoryview(b"")
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._chunk:
+            if self._eof:
+                return 0
+            item = self._pipe.get()
+            if item is _END:
+                self._eof = True
+                return 0
+            self._chunk = memoryview(item)
+        n = min(len(b), len(self._chunk))
+        b[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
 
+    def drain(self) -> None:
+        """Descarta o que o consumidor não leu do membro."""
+        self._chunk = memoryview(b"")
+        while not self._eof:
+            if self._pipe.get() is _END:
+                self._eof = True
+
+
+def _extract_7z_piped(
+    z, wanted: dict, io_base: type, factory_base: type, stream: bool, buffer_size: int
+) -> Iterator[Tuple[str, BinaryIO]]:
+    """Extrai ``wanted`` (``{nome: (nome_seguro, tamanho)}``) numa só passagem.
+
+    O py7zr escreve cada membro num ``Py7zIO`` da nossa ``WriterFactory``, numa
+    thread à parte; os blocos passam por uma fila limitada e o membro é
+    entregue enquanto é descomprimido. Nada vai para o disco temporário e,
+    além do bloco que o próprio py7zr descomprime, a memória fica em
+    ``_PIPE_CHUNKS`` blocos de ``_COPY_CHUNK``.
+    """
+    pipe: queue.Queue = queue.Queue(maxsize=_PIPE_CHUNKS)
+    cancel = threading.Event()
+
+    def put(item) -> None:
+        while not cancel.is_set():
+            try:
+                pipe.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Cancelled
+
+    class Writer(io_base):
+        def __init__(self, name: str | None):
+            self.name = name
+            self.written = 0
+            self.open = name is not None
+            if self.open:
+                put(("membro", name))
+
+        def write(self, s) -> int:
+            if self.open:
+                # o py7zr escreve blocos até 128 MB: a fila fica limitada em bytes
+                view = memoryview(s)
+                for i in range(0, len(view), _COPY_CHUNK):
+                    put(bytes(view[i:i + _COPY_CHUNK]))
+            self.written += len(s)
+            return len(s)
+
+        def read(self, size=None) -> bytes:
+            return b""
+
+        def seek(self, offset: int, whence: int = 0) -> int:
+            return 0
+
+        def flush(self) -> None:
+            pass
+
+        def size(self) -> int:
+            return self.written
+
+        def close(self) -> None:
+            if self.open:
+                self.open = False
+                put(_END)
+
+    class Factory(factory_base):
+        current = None
+
+        def create(self, filename: str):
+            # versões sem Py7zIO.close: o membro seguinte fecha o anterior
+            if self.current is not None:
+                self.current.close()
+            # com path=None o py7zr usa o nome do membro (relativo)
+            self.current = Writer(filename if filename in wanted else None)
+            return self.current
+
+    factory = Factory()
+    error: list[BaseException] = []
+
+    def run() -> None:
+        try:
+            z.extract(targets=list(wanted), factory=factory)
+            if factory.current is not None:
+                factory.current.close()
+        except _Cancelled:
+            return
+        except BaseException as e:
+            error.append(e)
+        try:
+            put(None)
+        except _Cancelled:
+            pass
+
+    worker = threading.Thread(target=run, name="7z-extract", daemon=True)
+    worker.start()
+    delivered = 0
+    try:
+        while (item := pipe.get()) is not None:
+            if item is _END:
+                continue            # fim de um membro já entregue e lido
+            safe_name, size = wanted[item[1]]
+            reader = _PipeReader(pipe)
+            yield safe_name, _deliver(reader, size, stream, buffer_size)
+            reader.drain()
+            delivered += 1
+        if error:
+            raise error[0]
+        if delivered < len(wanted):
+            raise ArchiveBackendError(f"py7zr não entregou {len(wanted) - delivered} membro(s)")
+    finally:
+        cancel.set()
+        worker.join()
+
+
+def _open_staged(staging: Path, name: str) -> BinaryIO | None:
+    """Abre ``staging/name`` se for um ficheiro regular dentro de ``staging``.
+
+    SEGURANÇA: a ferramenta de extração pode ter criado links simbólicos
+    (no membro ou numa pasta do caminho); segui-los copiaria para o backup
+    ficheiros da máquina fora do arquivo.
+    """
+    staged = staging / name
+    root = os.path.realpath(staging)
+    if os.path.commonpath([root, os.path.realpath(staged)]) != root:
+        return None
+    try:
+        if not stat.S_ISREG(os.lstat(staged).st_mode):
+            return None
+        fd = os.open(staged, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_BINARY", 0))
+    except OSError:
+        return None
+    return os.fdopen(fd, "rb")
+
+
+def _rar_command(archive: Path, dest: Path, listfile: Path, tools: Iterable[str]) -> list[str]:
+    """Linha de comando da primeira ferramenta de ``tools`` instalada."""
+    for tool in dict.fromkeys(tools):
+        args = _RAR_TOOLS.get(Path(tool).stem.lower())
+        exe = shutil.which(tool)
+        if args is not None and exe:
+            fields = {"arc": os.fspath(archive), "dest": os.fspath(dest), "list": os.fspath(listfile)}
+            return [exe, *(a.format(**fields) for a in args)]
+    raise ArchiveBackendError(
+        f"RAR ignorado: nenhuma ferramenta de extração encontrada ({', '.join(_RAR_TOOLS)})"
+    )
+
+
+def _rar_pattern(exe: str, name: str) -> str:
+    """``name`` como entrada literal da lista de ``exe``."""
+    special = _RAR_ESCAPE.get(Path(exe).stem.lower(), "")
+    return "".join("\\" + c if c in special else c for c in name)
+
+
+def _extract_rar_batch(
+    path: Path, wanted: dict, tools: Iterable[str], stream: bool, buffer_size: int
+) -> Iterator[Tuple[str, BinaryIO]]:
+    """Extrai ``wanted`` (``{nome: (nome_seguro, tamanho)}``) numa só chamada e entrega-os.
+
+    Membros que a ferramenta não extraiu, ou que ficaram como link ou pasta,
+    não são entregues e contam como falha no fim. Num RAR real, verificar à
+    mão com ``python benchmarks/bench_archive.py --rar x.rar`` (compara os
+    membros e bytes com os de ``rarfile``).
+    """
+    with tempfile.TemporaryDirectory(prefix="rar-") as staging:
+        staging = Path(staging)
+        listfile = staging / "membros.lst"
+        dest = staging / "out"
+        dest.mkdir()
+        cmd = _rar_command(path, dest, listfile, tools)
+        listfile.write_text("".join(_rar_pattern(cmd[0], n) + "\n" for n in wanted), encoding="utf-8")
+        proc = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        missing = 0
+        for safe_name, size in wanted.values():
+            f = _open_staged(dest, safe_name)
+            if f is None:
+                missing += 1
+                continue
+            with f:
+                yield safe_name, _deliver(f, size, stream, buffer_size)
+            os.unlink(dest / safe_name)
+        if proc.returncode or missing:
+            detail = proc.stderr.decode(errors="replace").strip().splitlines()[-1:]
+            raise ArchiveBackendError(
+                f"{Path(cmd[0]).name} terminou com código {proc.returncode}; "
+                f"{missing} membro(s) não extraído(s) {' '.join(detail)}".rstrip()
+            )
+
+
+def _deliver(f: BinaryIO, size: int, stream: bool, buffer_size: int) -> BinaryIO:
+    """O stream do membro, ou uma cópia dele em ``SpooledTemporaryFile``."""
+    if not stream:
+        spool = tempfile.SpooledTemporaryFile(max_size=buffer_size)
+        shutil.copyfileobj(f, spool, _COPY_CHUNK)
+        spool.seek(0)
+        f = spool
+    try:
+        f.member_size = size
+    except AttributeError:
+        pass                # objetos em C sem __dict__: fica sem tamanho
+    return f
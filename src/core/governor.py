@@ -0,0 +1,208 @@
+"""Limites de recursos para backups em máquinas de produção.
+
+Três baldes de fichas (token bucket) limitam os bytes lidos por segundo, os
+bytes escritos por segundo e os ficheiros por segundo; quem passa o limite
+fica a dever fichas e dorme o tempo necessário para as repor, pelo que o
+débito médio fica no limite mesmo com vários workers. Os limites podem ser
+mudados a qualquer momento (:meth:`Governor.set_limits`, da GUI ou de outra
+thread) e aplicam-se logo à próxima operação.
+
+Além disso, só em Linux, o processo pode baixar a prioridade de CPU (``nice``)
+e a de I/O (``ioprio_set``: ``idle`` ou ``best-effort:0..7``). As duas
+aplicam-se à thread que chama :meth:`Governor.apply_priority` e às threads e
+processos que ela criar depois; ``nice`` não pode ser revertido sem
+privilégios. Noutros sistemas ``nice`` valeria para o processo inteiro (a GUI
+incluída, até ao fim) e é ignorado.
+"""
+from __future__ import annotations
+
+import ctypes
+import os
+import platform
+import sys
+import threading
+import time
+from typing import BinaryIO, Callable, Optional
+
+# números da syscall ioprio_set por arquitetura (Linux)
+_IOPRIO_SET = {"x86_64": 251, "aarch64": 30, "i386": 289, "i686": 289, "armv7l": 314, "ppc64le": 273}
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASSES = {"best-effort": 2, "idle": 3}
+_IOPRIO_WHO_PROCESS = 1
+# fatia máxima de cada sono, para o cancelamento e os novos limites se sentirem
+_SLEEP_SLICE = 0.25
+_KEEP = object()
+
+
+class TokenBucket:
+    """Balde de ``rate`` fichas/s com capacidade ``burst`` (``rate=None``: sem limite)."""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._stamp = time.monotonic()
+        self.rate: Optional[float] = None
+        self.burst = 0.0
+        self.tokens = 0.0
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        with self._lock:
+            self._refill_locked()
+            self.rate = rate or None
+            # por omissão um segundo de débito
+            self.burst = burst or (rate or 0.0)
+            self.tokens = min(self.tokens, self.burst) if self.rate else 0.0
+
+    def consume(self, n: float) -> float:
+        """Gasta ``n`` fichas; devolve quanto tempo é preciso esperar (0 se nenhum)."""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill_locked()
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def _refill_locked(self) -> None:
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+
+class Governor:
+    """Aplica os limites de débito e de prioridade a uma execução (thread-safe)."""
+
+    def __init__(
+        self,
+        read_bps: Optional[float] = None,
+        write_bps: Optional[float] = None,
+        files_per_sec: Optional[float] = None,
+        nice: Optional[int] = None,
+        ioprio: Optional[str] = None,
+        stop_flag: Optional[Callable[[], bool]] = None,
+    ):
+        self.buckets = {
+            "read": TokenBucket(read_bps),
+            "write": TokenBucket(write_bps),
+            "files": TokenBucket(files_per_sec),
+        }
+        self.nice = nice
+        self.ioprio = ioprio
+        self.stop_flag = stop_flag or (lambda: False)
+        self._lock = threading.Lock()
+        self.throttled = {name: 0.0 for name in self.buckets}
+        self.priority: dict = {}
+
+    def set_limits(self, read_bps=_KEEP, write_bps=_KEEP, files_per_sec=_KEEP) -> None:
+        """Muda os limites durante a execução; ``None`` ou 0 retira o limite."""
+        for name, rate in (("read", read_bps), ("write", write_bps), ("files", files_per_sec)):
+            if rate is not _KEEP:
+                self.buckets[name].set_rate(rate)
+
+    def limits(self) -> dict:
+        return {
+            "read_bps": self.buckets["read"].rate,
+            "write_bps": self.buckets["write"].rate,
+            "files_per_sec": self.buckets["files"].rate,
+        }
+
+    @property
+    def limited(self) -> bool:
+        return any(b.rate for b in self.buckets.values())
+
+    def read(self, nbytes: int) -> None:
+        self._wait("read", nbytes)
+
+    def write(self, nbytes: int) -> None:
+        self._wait("write", nbytes)
+
+    def copy(self, nbytes: int) -> None:
+        self._wait("read", nbytes)
+        self._wait("write", nbytes)
+
+    def file(self) -> None:
+        self._wait("files", 1)
+
+    def wrap(self, fobj: BinaryIO, charge: Optional[Callable[[int], None]] = None) -> BinaryIO:
+        """``fobj`` com as leituras (``read``/``readinto``) contadas em ``charge`` (``copy``)."""
+        if not self.limited:
+            return fobj
+        return _Throttled(fobj, charge or self.copy)
+
+    def apply_priority(self) -> dict:
+        """Baixa ``nice`` e a classe de I/O da thread atual; devolve o que foi aplicado."""
+        result: dict = {}
+        if self.nice is not None and not sys.platform.startswith("linux"):
+            result["nice"] = "ignorado fora de Linux"
+        elif self.nice is not None:
+            try:
+                result["nice"] = os.nice(self.nice)
+            except OSError as e:
+                result["nice"] = f"falhou: {e}"
+        if self.ioprio:
+            result["ioprio"] = _set_ioprio(self.ioprio)
+        self.priority = result
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_limit = dict(self.throttled)
+        return {
+            "throttled_s": sum(by_limit.values()),
+            "by_limit": by_limit,
+            "limits": self.limits(),
+            "priority": self.priority,
+        }
+
+    def _wait(self, name: str, n: float) -> None:
+        delay = self.buckets[name].consume(n)
+        if delay <= 0:
+            return
+        start = time.monotonic()
+        end = start + delay
+        while not self.stop_flag():
+            left = end - time.monotonic()
+            if left <= 0:
+                break
+            time.sleep(min(left, _SLEEP_SLICE))
+        with self._lock:
+            self.throttled[name] += time.monotonic() - start
+
+
+class _Throttled:
+    """Invólucro de leitura que desconta cada bloco lido no governador."""
+
+    def __init__(self, fobj: BinaryIO, charge: Callable[[int], None]):
+        self._f = fobj
+        self._charge = charge
+
+    def readinto(self, buf) -> int:
+        n = self._f.readinto(buf)
+        if n:
+            self._charge(n)
+        return n
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(size)
+        if data:
+            self._charge(len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+def _set_ioprio(spec: str) -> str:
+    """``idle`` ou ``best-effort[:0-7]`` para a thread atual (só Linux)."""
+    cls_name, _, level = spec.partition(":")
+    cls = _IOPRIO_CLASSES.get(cls_name)
+    if cls is None:
+        raise ValueError(f"Prioridade de I/O inválida: {spec!r}. Use idle ou best-effort:0..7")
+    nr = _IOPRIO_SET.get(platform.machine())
+    if not platform.system() == "Linux" or nr is None:
+        return "indisponível neste sistema"
+    value = (cls << _IOPRIO_CLASS_SHIFT) | (int(level or 7) & 7)
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.syscall(nr, _IOPRIO_WHO_PROCESS, 0, value) != 0:
+        return f"falhou: {os.strerror(ctypes.get_errno())}"
+    return spec
@@ -0,0 +1,111 @@
+"""Cache persistente de digests, guardada em SQLite na raiz do destino.
+
+Cada entrada associa um caminho (origem ou destino) ao digest do conteúdo,
+válido enquanto ``(tamanho, mtime_ns, inode)`` não mudarem. Assim uma nova
+execução para o mesmo destino não precisa de reler ficheiros que não foram
+alterados desde a anterior.
+
+Expiração: uma entrada cuja chave já não corresponde ao ficheiro é apagada
+no momento da consulta; entradas que não são consultadas nem gravadas em
+``keep_runs`` execuções seguidas (ficheiros apagados, origens que deixaram
+de ser copiadas) são removidas ao fechar a cache.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+CACHE_NAME = ".backup_hashcache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path     TEXT    NOT NULL,
+    algo     TEXT    NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode    INTEGER NOT NULL,
+    digest   TEXT    NOT NULL,
+    seen     INTEGER NOT NULL,
+    PRIMARY KEY (path, algo)
+);
+CREATE INDEX IF NOT EXISTS hashes_seen ON hashes (seen);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+class HashCache:
+    """Cache ``caminho -> digest`` chaveada por ``(size, mtime_ns, inode)`` (thread-safe)."""
+
+    def __init__(self, root: Path, keep_runs: int = 3, commit_every: int = 1000):
+        self.path = Path(root) / CACHE_NAME
+        self.keep_runs = keep_runs
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'run'").fetchone()
+        self.run = (row[0] if row else 0) + 1
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('run', ?)", (self.run,))
+        self._db.commit()
+
+    def get(self, path: Path, size: int, mtime_ns: int, inode: int, algo: str) -> Optional[str]:
+        """Digest guardado para ``path`` se a chave ainda corresponder; senão ``None``."""
+        key = os.fspath(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, inode, digest FROM hashes WHERE path = ? AND algo = ?",
+                (key, algo),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if tuple(row[:3]) != (size, mtime_ns, inode):
+                # ficheiro mudou desde que o digest foi calculado
+                self._db.execute("DELETE FROM hashes WHERE path = ? AND algo = ?", (key, algo))
+                self.evicted += 1
+                self.misses += 1
+                self._dirty_locked()
+                return None
+            self._db.execute(
+                "UPDATE hashes SET seen = ? WHERE path = ? AND algo = ?", (self.run, key, algo)
+            )
+            self.hits += 1
+            self._dirty_locked()
+            return row[3]
+
+    def put(self, path: Path, size: int, mtime_ns: int, inode: int, algo: str, digest: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes (path, algo, size, mtime_ns, inode, digest, seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.fspath(path), algo, size, mtime_ns, inode, digest, self.run),
+            )
+            self._dirty_locked()
+
+    def get_stat(self, path: Path, st: os.stat_result, algo: str) -> Optional[str]:
+        return self.get(path, st.st_size, st.st_mtime_ns, st.st_ino, algo)
+
+    def put_stat(self, path: Path, st: os.stat_result, algo: str, digest: str) -> None:
+        self.put(path, st.st_size, st.st_mtime_ns, st.st_ino, algo, digest)
+
+    def close(self) -> int:
+        """Remove entradas expiradas, grava e fecha. Devolve quantas removeu."""
+        with self._lock:
+            cur = self._db.execute("DELETE FROM hashes WHERE seen <= ?", (self.run - self.keep_runs,))
+            pruned = cur.rowcount
+            self._db.commit()
+            self._db.close()
+            return pruned
+
+    def _dirty_locked(self) -> None:
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._db.commit()
+            self._pending = 0
@@ -1,9 +1,169 @@
 from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, NamedTuple, Union
 import hashlib
+import os
 
-def file_hash(path: Path, algo: str = "sha256") -> str:
+from .iopolicy import DEFAULT_POLICY, IOPolicy, buffer
+
+_COPY_BUF = 1024 * 1024
+# Ficheiros a partir deste tamanho passam pela amostragem início/meio/fim
+SAMPLE_THRESHOLD = 4 * 1024 * 1024
+SAMPLE_BLOCK = 64 * 1024
+
+# digest já conhecido (str) ou função que o calcula lendo o ficheiro
+Digest = Union[str, Callable[[], str], None]
+
+
+def new_hasher(algo: str = "sha256"):
+    """``hashlib.new`` com erro legível para algoritmos desconhecidos."""
+    try:
+        return hashlib.new(algo)
+    except (ValueError, TypeError):
+        raise ValueError(f"Algoritmo de hash desconhecido: {algo!r}") from None
+
+
+def file_hash(path: Path, algo: str = "sha256", policy: IOPolicy | None = None) -> str:
+    """Digest de ``path``, lido com o buffer e as dicas de cache de ``policy``."""
+    policy = policy or DEFAULT_POLICY
     h = hashlib.new(algo)
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        st = os.fstat(fd)
+        policy.start_read(fd)
+        update_hash(f, h, policy.size_for(st.st_size, st.st_dev))
+        policy.done(fd)
+    return h.hexdigest()
+
+
+def copy_hashing(fsrc: BinaryIO, fdst: BinaryIO, h, bufsize: int = _COPY_BUF) -> int:
+    """Copia ``fsrc`` para ``fdst`` e atualiza ``h`` na mesma passagem de leitura.
+
+    Com ``h=None`` é só uma cópia com ``readinto``. Devolve o número de bytes copiados.
+    """
+    view = buffer(bufsize)
+    total = 0
+    while True:
+        n = fsrc.readinto(view)
+        if not n:
+            break
+        if h is not None:
+            h.update(view[:n])
+        fdst.write(view[:n])
+        total += n
+    return total
+
+
+def update_hash(fsrc: BinaryIO, h, bufsize: int = _COPY_BUF) -> None:
+    """Lê ``fsrc`` até ao fim para dentro de ``h`` (quando não há cópia a fazer)."""
+    view = buffer(bufsize)
+    while True:
+        n = fsrc.readinto(view)
+        if not n:
+            break
+        h.update(view[:n])
+
+
+def range_algo(algo: str, range_size: int) -> str:
+    """Nome do digest por intervalos: não é comparável com o digest simples de ``algo``."""
+    return f"{algo}-ranges-{range_size}"
+
+
+def combine_range_digests(algo: str, digests: Iterable[str]) -> str:
+    """Digest final de uma cópia por intervalos: ``algo`` sobre os digests de cada intervalo."""
+    h = new_hasher(algo)
+    for d in digests:
+        h.update(bytes.fromhex(d))
     return h.hexdigest()
+
+
+def file_range_hash(path: Path, algo: str, range_size: int, policy: IOPolicy | None = None) -> str:
+    """Digest por intervalos de ``path`` calculado em série (verificação de cópias por intervalos)."""
+    policy = policy or DEFAULT_POLICY
+    digests = []
+    with open(path, "rb", buffering=0) as f:
+        policy.start_read(f.fileno())
+        bufsize = min(policy.size_for(range_size), range_size)
+        while True:
+            h = new_hasher(algo)
+            got = 0
+            while got < range_size:
+                chunk = f.read(min(bufsize, range_size - got))
+                if not chunk:
+                    break
+                h.update(chunk)
+                got += len(chunk)
+            if not got:
+                break
+            digests.append(h.hexdigest())
+            if got < range_size:
+                break
+        policy.done(f.fileno())
+    return combine_range_digests(algo, digests)
+
+
+class CompareResult(NamedTuple):
+    """Resultado de :func:`compare_files`.
+
+    ``tier`` diz que nível decidiu: ``size``, ``digest``, ``sample`` ou
+    ``lockstep``; ``bytes_read`` é o total lido dos dois ficheiros.
+    """
+    equal: bool
+    tier: str
+    bytes_read: int
+
+
+def compare_files(
+    a: Path,
+    b: Path,
+    size_a: int | None = None,
+    size_b: int | None = None,
+    digest_a: Digest = None,
+    digest_b: Digest = None,
+    sample_threshold: int = SAMPLE_THRESHOLD,
+    block: int = SAMPLE_BLOCK,
+) -> CompareResult:
+    """Compara o conteúdo de dois ficheiros pelo nível mais barato que decida.
+
+    1. ``size``: tamanhos diferentes (dados do ``stat`` já feito) -> diferentes;
+    2. ``digest``: se os dois digests já são conhecidos (str), sem ler nada;
+    3. ``sample``: ficheiros grandes comparam blocos do início, meio e fim;
+    4. ``digest`` calculado, se foram dadas funções de digest (que podem
+       alimentar uma cache); caso contrário ``lockstep``: lê os dois ficheiros
+       em paralelo e para no primeiro bloco diferente.
+    """
+    if size_a is None:
+        size_a = os.stat(a).st_size
+    if size_b is None:
+        size_b = os.stat(b).st_size
+    if size_a != size_b:
+        return CompareResult(False, "size", 0)
+
+    if isinstance(digest_a, str) and isinstance(digest_b, str):
+        return CompareResult(digest_a == digest_b, "digest", 0)
+
+    read = 0
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        if size_a >= sample_threshold:
+            for offset in (0, (size_a - block) // 2, size_a - block):
+                fa.seek(offset)
+                fb.seek(offset)
+                ca, cb = fa.read(block), fb.read(block)
+                read += len(ca) + len(cb)
+                if ca != cb:
+                    return CompareResult(False, "sample", read)
+
+        if digest_a is not None and digest_b is not None:
+            da = digest_a if isinstance(digest_a, str) else digest_a()
+            db = digest_b if isinstance(digest_b, str) else digest_b()
+            read += (0 if isinstance(digest_a, str) else size_a) + (0 if isinstance(digest_b, str) else size_b)
+            return CompareResult(da == db, "digest", read)
+
+        fa.seek(0)
+        fb.seek(0)
+        while True:
+            ca, cb = fa.read(_COPY_BUF), fb.read(_COPY_BUF)
+            read += len(ca) + len(cb)
+            if ca != cb:
+                return CompareResult(False, "lockstep", read)
+            if not ca:
+                return CompareResult(True, "lockstep", read)
@@ -0,0 +1,192 @@
+"""Diário de retoma: o que já ficou concluído num backup interrompido.
+
+Cada item concluído (ficheiro copiado, ficheiro que já existia igual, membro
+de arquivo extraído, arquivo extraído por completo) acrescenta uma linha JSON
+a ``.backup_journal.jsonl`` na raiz do destino, com a chave da origem
+(caminho relativo + tamanho + mtime), o destino e o digest quando é
+conhecido. Uma execução com ``resume=True`` salta os itens cuja origem não
+mudou e cujo destino ainda existe, sem os ler nem comparar. A linha de um
+arquivo extraído por completo guarda também as extensões pedidas e os
+destinos de todos os membros: só conta como concluída com as mesmas
+extensões e com esses destinos todos presentes.
+
+A linha só é gravada depois de os dados do item estarem em disco segundo o
+nível de durabilidade: com ``batched``/``end-of-run`` as linhas ficam em
+memória até ao checkpoint seguinte (ver ``Durability.add_checkpoint_hook``).
+No fim da execução o diário é compactado (uma linha por chave; se a execução
+terminou sem cancelamento, só as chaves vistas nesta execução).
+
+A primeira linha guarda as opções que decidem o destino de cada item
+(estrutura, compressão, empacotamento…). Se a execução seguinte usar outras,
+o diário anterior é descartado: os destinos gravados já não são os que essa
+execução escreveria.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+JOURNAL_NAME = ".backup_journal.jsonl"
+
+
+class ResumeJournal:
+    """Diário append-only de itens concluídos (thread-safe)."""
+
+    def __init__(self, root: Path, deferred: bool = False, options: Optional[dict] = None):
+        self.root = Path(root)
+        self.path = self.root / JOURNAL_NAME
+        self.deferred = deferred
+        self.options = options or {}
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self._pending: list[str] = []
+        loaded_options = self._load()
+        # diário de outras opções (ou anterior a elas): recomeça do zero
+        self.discarded = 0
+        if self._entries and loaded_options != self.options:
+            self.discarded = len(self._entries)
+            self._entries.clear()
+        self.loaded = len(self._entries)
+        if self._entries:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        else:
+            self._fh = open(self.path, "w", encoding="utf-8")
+            self._fh.write(self._options_line())
+            self._fh.flush()
+
+    def completed(
+        self, key: str, size: int, mtime_ns: int, extensions: Optional[Iterable[str]] = None
+    ) -> Optional[dict]:
+        """Entrada de ``key`` se a origem não mudou e o destino ainda existe."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if not is_current(entry, self.root, size, mtime_ns, extensions):
+            return None
+        with self._lock:
+            self._seen.add(key)
+        return entry
+
+    def entries(self, prefix: str) -> dict[str, dict]:
+        """Cópia das entradas cujas chaves começam por ``prefix`` (ex. ``arquivo.zip!``)."""
+        with self._lock:
+            return {k: dict(e) for k, e in self._entries.items() if k.startswith(prefix)}
+
+    def record(
+        self,
+        key: str,
+        size: int,
+        mtime_ns: int,
+        dst: Optional[Path] = None,
+        digest: Optional[str] = None,
+        members: Optional[int] = None,
+        extensions: Optional[Iterable[str]] = None,
+        dsts: Optional[Iterable[Path]] = None,
+    ) -> None:
+        entry: dict = {"key": key, "size": size, "mtime_ns": mtime_ns}
+        if dst is not None:
+            entry["dst"] = _rel(dst, self.root)
+        if digest:
+            entry["digest"] = digest
+        if members is not None:
+            entry["members"] = members
+        if extensions is not None:
+            entry["extensions"] = _norm_extensions(extensions)
+        if dsts is not None:
+            entry["dsts"] = [_rel(d, self.root) for d in dsts]
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[key] = entry
+            self._seen.add(key)
+            if self.deferred:
+                self._pending.append(line)
+            else:
+                self._fh.write(line)
+                self._fh.flush()
+
+    def prepare_checkpoint(self) -> Callable[[], None]:
+        """Hook de ``Durability``: as linhas pendentes agora são gravadas depois do sync."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+
+        def commit() -> None:
+            with self._lock:
+                self._write_locked(batch)
+
+        return commit
+
+    def close(self, complete: bool) -> int:
+        """Grava o pendente e compacta o diário. Devolve o número de entradas."""
+        with self._lock:
+            self._write_locked(self._pending)
+            self._pending = []
+            self._fh.close()
+            keep = [e for k, e in self._entries.items() if not complete or k in self._seen]
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(self._options_line())
+                for entry in keep:
+                    fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            return len(keep)
+
+    def _write_locked(self, lines: list[str]) -> None:
+        if not lines or self._fh.closed:
+            return
+        self._fh.writelines(lines)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def _options_line(self) -> str:
+        return json.dumps({"options": self.options}, ensure_ascii=False, sort_keys=True) + "\n"
+
+    def _load(self) -> Optional[dict]:
+        """Carrega as entradas; devolve as opções gravadas (``None`` se não houver)."""
+        try:
+            with open(self.path, "rb") as fh:
+                data = fh.read()
+        except FileNotFoundError:
+            return None
+        options = None
+        for raw in data.splitlines():
+            try:
+                entry = json.loads(raw)
+                if "options" in entry:
+                    options = entry["options"]
+                else:
+                    self._entries[entry["key"]] = entry
+            except (ValueError, KeyError, TypeError):
+                continue  # linha cortada por um crash a meio da escrita
+        if data and not data.endswith(b"\n"):
+            # termina a linha cortada para a próxima não lhe ficar colada
+            with open(self.path, "ab") as fh:
+                fh.write(b"\n")
+        return options
+
+
+def is_current(
+    entry: Optional[dict], root: Path, size: int, mtime_ns: int, extensions: Optional[Iterable[str]] = None
+) -> bool:
+    """A regra de :meth:`ResumeJournal.completed` para uma entrada já lida."""
+    if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+        return False
+    if extensions is not None and entry.get("extensions") != _norm_extensions(extensions):
+        return False
+    dsts = entry.get("dsts", [entry["dst"]] if "dst" in entry else [])
+    return all((root / d).exists() for d in dsts)
+
+
+def _norm_extensions(extensions: Iterable[str]) -> list[str]:
+    return sorted({e.lower().lstrip(".") for e in extensions})
+
+
+def _rel(p: Path, base: Path) -> str:
+    try:
+        return p.relative_to(base).as_posix()
+    except ValueError:
+        return p.as_posix()
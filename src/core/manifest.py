@@ -0,0 +1,77 @@
+"""Manifesto por execução com o digest de cada ficheiro escrito no destino.
+
+O digest é calculado na mesma passagem de leitura da cópia; o manifesto
+guarda-o em JSON Lines para que comparações, verificações e deduplicação
+posteriores o reutilizem sem voltar a ler os ficheiros.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+
+class RunManifest:
+    """Uma linha JSON por ficheiro escrito: origem, destino, tamanho e digest.
+
+    Os caminhos são relativos à origem e ao destino do backup (membros de
+    arquivos aparecem como ``arquivo.zip!interno``). Thread-safe.
+    """
+
+    def __init__(self, base_src: Path, base_dst: Path, algo: str = "sha256", path: Path | None = None):
+        self.base_src = Path(base_src)
+        self.base_dst = Path(base_dst)
+        self.algo = algo
+        now = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = Path(path) if path else self.base_dst / f"backup_manifest_{now}.jsonl"
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        # digests desta execução por destino, para comparações sem reler
+        self._digests: dict[str, str] = {}
+
+    def add(self, src: str | Path, dst: Path, size: int, digest: str, algo: str | None = None) -> None:
+        """``algo`` só difere do da execução para digests por intervalos (ver ``hasher.range_algo``)."""
+        entry = {
+            "src": self._rel(src, self.base_src),
+            "dst": self._rel(dst, self.base_dst),
+            "size": size,
+            "algo": algo or self.algo,
+            "digest": digest,
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._fh.write(line + "\n")
+            if algo in (None, self.algo):
+                self._digests[str(dst)] = digest
+
+    def member_name(self, archive: Path, inner_name: str) -> str:
+        """Nome de origem de um membro de arquivo, ex. ``fotos/ferias.zip!a.jpg``."""
+        return f"{self._rel(archive, self.base_src)}!{inner_name}"
+
+    def digest_of(self, dst: Path) -> str | None:
+        """Digest de ``dst`` se foi escrito nesta execução."""
+        with self._lock:
+            return self._digests.get(str(dst))
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+    @staticmethod
+    def read(path: Path) -> Iterator[dict]:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def _rel(p: str | Path, base: Path) -> str:
+        if isinstance(p, str):
+            return p
+        try:
+            return p.relative_to(base).as_posix()
+        except ValueError:
+            return p.as_posix()
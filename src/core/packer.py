@@ -0,0 +1,276 @@
+"""Empacotamento de ficheiros pequenos em segmentos por extensão.
+
+Centenas de milhares de ficheiros minúsculos (``.py``, ``.cs``…) custam um
+inode e várias escritas de metadados cada um, o que em discos USB/exFAT é o
+que mais pesa. Neste modo os ficheiros abaixo de um limiar são acrescentados
+a segmentos ``packs/<ext>/seg-000001.zip`` (membros guardados sem compressão
+ou com deflate) ou ``.tar``, que rodam ao chegar a ``segment_bytes``.
+
+O índice ``packs/index.sqlite`` guarda, por caminho lógico (o que o ficheiro
+teria na árvore normal, ex. ``py/src/app.py``), o segmento, o offset do
+membro, os tamanhos e o digest. :class:`PackIndex` consulta o índice e
+restaura um ficheiro com uma leitura posicionada, sem percorrer os segmentos
+(funciona mesmo num ``.zip`` a que falta o diretório central por a execução
+ter sido interrompida).
+"""
+from __future__ import annotations
+
+import io
+import os
+import sqlite3
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from .hasher import new_hasher
+
+PACKS_DIR = "packs"
+INDEX_NAME = "index.sqlite"
+FORMATS = ("zip", "zip-deflate", "tar")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    path     TEXT    PRIMARY KEY,
+    segment  TEXT    NOT NULL,
+    offset   INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    csize    INTEGER NOT NULL,
+    method   TEXT    NOT NULL,
+    algo     TEXT    NOT NULL,
+    digest   TEXT    NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS members_segment ON members (segment);
+"""
+_ZIP_LOCAL_HEADER = 30
+_ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+class PackEntry(NamedTuple):
+    """Linha do índice. ``offset``: cabeçalho local (zip) ou início dos dados (tar)."""
+    path: str
+    segment: str
+    offset: int
+    size: int
+    csize: int
+    method: str
+    algo: str
+    digest: str
+    mtime_ns: int
+
+
+class PackIndex:
+    """Consulta e restauro de ficheiros empacotados (thread-safe)."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root) / PACKS_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / INDEX_NAME, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def lookup(self, path: str) -> Optional[PackEntry]:
+        with self._lock:
+            return self._lookup_locked(path)
+
+    def list(self, prefix: str = "") -> Iterator[PackEntry]:
+        """Entradas cujo caminho lógico começa por ``prefix`` (ex. ``py/src/``)."""
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM members WHERE path LIKE ? ESCAPE '\\' ORDER BY path", (pattern,)
+            ).fetchall()
+        for row in rows:
+            yield PackEntry(*row)
+
+    def read(self, path: str) -> bytes:
+        """Conteúdo de ``path``, verificado contra o digest do índice."""
+        entry = self.lookup(path)
+        if entry is None:
+            raise KeyError(path)
+        with open(self.root / entry.segment, "rb") as fh:
+            fh.seek(entry.offset)
+            if entry.method != "tar":
+                header = fh.read(_ZIP_LOCAL_HEADER)
+                if header[:4] != b"PK\x03\x04":
+                    raise ValueError(f"Cabeçalho zip inválido para {path} em {entry.segment}")
+                name_len, extra_len = struct.unpack("<HH", header[26:30])
+                fh.seek(entry.offset + _ZIP_LOCAL_HEADER + name_len + extra_len)
+            data = fh.read(entry.csize)
+        if entry.method == "deflate":
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+        h = new_hasher(entry.algo)
+        h.update(data)
+        if len(data) != entry.size or h.hexdigest() != entry.digest:
+            raise ValueError(f"Conteúdo empacotado corrompido: {path} ({entry.segment})")
+        return data
+
+    def restore(self, path: str, target: Path) -> Path:
+        """Escreve ``path`` em ``target`` com o mtime original."""
+        entry = self.lookup(path)
+        data = self.read(path)
+        target = Path(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+        return target
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def _lookup_locked(self, path: str) -> Optional[PackEntry]:
+        row = self._db.execute("SELECT * FROM members WHERE path = ?", (path,)).fetchone()
+        return PackEntry(*row) if row else None
+
+
+class SegmentPacker(PackIndex):
+    """Acrescenta ficheiros pequenos aos segmentos da sua extensão.
+
+    ``on_closed(fd, path, nbytes)`` é chamado com cada segmento ainda aberto
+    quando fica completo (durabilidade); o índice é gravado a seguir.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        fmt: str = "zip",
+        threshold: int = 64 * 1024,
+        segment_bytes: int = 256 * 1024 * 1024,
+        algo: str = "sha256",
+        on_closed: Optional[Callable[[int, Path, int], None]] = None,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato de empacotamento inválido: {fmt!r}. Opções: {', '.join(FORMATS)}")
+        super().__init__(root)
+        self.fmt = fmt
+        self.threshold = threshold
+        self.segment_bytes = segment_bytes
+        self.algo = algo
+        self.on_closed = on_closed
+        self._open: dict[str, _Segment] = {}
+        self.files = 0
+        self.bytes = 0
+        self.segments = 0
+
+    def accepts(self, size: int) -> bool:
+        return size < self.threshold
+
+    def pack(self, src: Path, path: str, ext: str, mtime_ns: int) -> tuple[bool, PackEntry]:
+        """Empacota ``src`` como ``path``; devolve ``(empacotado, entrada)``.
+
+        Se o índice já tem ``path`` com o mesmo conteúdo nada é escrito
+        (``False``); com conteúdo diferente é usado ``<nome>_<n><ext>``.
+        """
+        with open(src, "rb") as fh:
+            data = fh.read()
+        h = new_hasher(self.algo)
+        h.update(data)
+        digest = h.hexdigest()
+
+        with self._lock:
+            stem, dot, suffix = path.rpartition(".")
+            if not dot or "/" in suffix:
+                stem, suffix = path, ""
+            candidate, n = path, 0
+            while True:
+                entry = self._lookup_locked(candidate)
+                if entry is None:
+                    break
+                if entry.size == len(data) and entry.algo == self.algo and entry.digest == digest:
+                    return False, entry
+                n += 1
+                candidate = f"{stem}_{n}.{suffix}" if suffix else f"{stem}_{n}"
+
+            seg = self._segment_locked(ext)
+            offset, csize, method = seg.append(candidate, data, mtime_ns)
+            entry = PackEntry(
+                candidate, seg.rel, offset, len(data), csize, method, self.algo, digest, mtime_ns
+            )
+            self._db.execute("INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", entry)
+            self.files += 1
+            self.bytes += len(data)
+            if seg.nbytes >= self.segment_bytes:
+                self._close_segment_locked(ext)
+            return True, entry
+
+    def close(self) -> None:
+        with self._lock:
+            for ext in list(self._open):
+                self._close_segment_locked(ext)
+        super().close()
+
+    def _segment_locked(self, ext: str) -> "_Segment":
+        seg = self._open.get(ext)
+        if seg is None:
+            folder = self.root / ext
+            folder.mkdir(exist_ok=True)
+            suffix = ".tar" if self.fmt == "tar" else ".zip"
+            # numeração continua a das execuções anteriores
+            seq = sum(1 for name in os.listdir(folder) if name.startswith("seg-")) + 1
+            while (folder / f"seg-{seq:06d}{suffix}").exists():
+                seq += 1
+            path = folder / f"seg-{seq:06d}{suffix}"
+            seg = self._open[ext] = _Segment(path, f"{ext}/{path.name}", self.fmt)
+            self.segments += 1
+        return seg
+
+    def _close_segment_locked(self, ext: str) -> None:
+        seg = self._open.pop(ext)
+        seg.finish()
+        if self.on_closed:
+            self.on_closed(seg.fh.fileno(), seg.path, seg.nbytes)
+        seg.fh.close()
+        # o índice só é gravado com os dados do segmento já escritos
+        self._db.commit()
+
+
+class _Segment:
+    """Um segmento aberto para escrita (zip ou tar sem compressão)."""
+
+    def __init__(self, path: Path, rel: str, fmt: str):
+        self.path = path
+        self.rel = rel
+        self.fh = open(path, "xb")
+        if fmt == "tar":
+            self._tar = tarfile.open(fileobj=self.fh, mode="w", format=tarfile.PAX_FORMAT)
+            self._zip = None
+        else:
+            self._tar = None
+            method = zipfile.ZIP_DEFLATED if fmt == "zip-deflate" else zipfile.ZIP_STORED
+            self._zip = zipfile.ZipFile(self.fh, "w", compression=method)
+
+    @property
+    def nbytes(self) -> int:
+        return self.fh.tell()
+
+    def append(self, name: str, data: bytes, mtime_ns: int) -> tuple[int, int, str]:
+        """Acrescenta um membro; devolve ``(offset, bytes no segmento, método)``."""
+        if self._tar is not None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime_ns / 1e9
+            self._tar.addfile(info, io.BytesIO(data))
+            # os dados ficam logo antes da posição atual, alinhados a blocos de 512
+            padded = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            return self._tar.offset - padded, len(data), "tar"
+
+        info = zipfile.ZipInfo(name, date_time=max(time.localtime(mtime_ns / 1e9)[:6], _ZIP_MIN_DATE))
+        info.compress_type = self._zip.compression
+        self._zip.writestr(info, data)
+        method = "deflate" if info.compress_type == zipfile.ZIP_DEFLATED else "stored"
+        return info.header_offset, info.compress_size, method
+
+    def finish(self) -> None:
+        # diretório central (zip) / blocos finais (tar); o ficheiro fica aberto
+        if self._tar is not None:
+            self._tar.close()
+        else:
+            self._zip.close()
+        self.fh.flush()
@@ -1,5 +1,6 @@
+import os
 from pathlib import Path
-from typing import Callable, Iterable, Iterator
+from typing import Callable, Iterable, Iterator, NamedTuple
 
 ARCH_MAP = {
     "zip": {".zip"},
@@ -8,6 +9,25 @@ ARCH_MAP = {
     "7z":  {".7z"}
 }
 
+
+def archive_suffixes(arch_types: Iterable[str] | None) -> tuple[str, ...]:
+    """Sufixos (incluindo compostos, ex. ``.tar.gz``) dos tipos de arquivo pedidos."""
+    return tuple(sorted(set().union(*[ARCH_MAP.get(a, set()) for a in arch_types or []])))
+
+
+class FileRecord(NamedTuple):
+    """Ficheiro encontrado no scan, com os metadados lidos durante a travessia.
+
+    Em Windows ``inode``/``device`` podem vir a 0 (não fazem parte da cache do
+    ``DirEntry``); nesse caso não devem ser usados como identidade.
+    """
+    path: Path
+    size: int
+    mtime_ns: int
+    inode: int
+    device: int
+
+
 def scan(
     root: Path,
     extensions: Iterable[str],
@@ -17,64 +37,81 @@ def scan(
     log_cb: Callable[[str], None] | None = None,
     treat_missing_as_warning: bool = False,
 ) -> Iterator[Path]:
+    for entry in _iter_matches(root, extensions, recursive, archives, arch_types, log_cb, treat_missing_as_warning):
+        yield Path(entry.path)
+
+
+def scan_records(
+    root: Path,
+    extensions: Iterable[str],
+    recursive: bool = True,
+    archives: bool = False,
+    arch_types: Iterable[str] | None = None,
+    log_cb: Callable[[str], None] | None = None,
+    treat_missing_as_warning: bool = False,
+) -> Iterator[FileRecord]:
+    """Igual a :func:`scan`, mas devolve :class:`FileRecord` em vez de ``Path``.
+
+    O ``stat`` é feito uma única vez por ficheiro (via ``DirEntry.stat()``) e
+    quem consome o registo não precisa de voltar a consultar a origem.
+    """
+    for entry in _iter_matches(root, extensions, recursive, archives, arch_types, log_cb, treat_missing_as_warning):
+        try:
+            st = entry.stat()
+        except Exception as e:
+            _warn(log_cb, f"⚠️  Erro ao processar {entry.path}: {e}")
+            continue
+        yield FileRecord(Path(entry.path), st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def _iter_matches(root, extensions, recursive, archives, arch_types, log_cb, treat_missing_as_warning):
     exts = {e.lower().lstrip(".") for e in extensions}
-    arch_exts = set().union(*[ARCH_MAP.get(a, set()) for a in arch_types or []])
+    arch_exts = archive_suffixes(arch_types)
 
     if not root.exists():
         msg = f"⚠️  Pasta não encontrada: {root}"
         if treat_missing_as_warning:
-            if log_cb:
-                log_cb(msg)
-            else:
-                print(msg)
+            _warn(log_cb, msg)
             return
         raise FileNotFoundError(msg)
 
-    if not recursive:
-        yield from _scan_dir(root, exts, archives, arch_exts, log_cb)
-        return
+    for entry in _iter_files(root, recursive, log_cb):
+        name = entry.name.lower()
+        if os.path.splitext(name)[1].lstrip(".") in exts:
+            yield entry
+        elif archives and name.endswith(arch_exts):
+            # endswith em vez do último sufixo: apanha .tar.gz / .tar.bz2
+            yield entry
+
+
+def _warn(log_cb: Callable[[str], None] | None, msg: str) -> None:
+    if log_cb:
+        log_cb(msg)
+    else:
+        print(msg)
 
-    for sub in _walk_dir(root, log_cb):
-        yield from _scan_dir(sub, exts, archives, arch_exts, log_cb)
 
+def _iter_files(root: Path, recursive: bool, log_cb: Callable[[str], None] | None = None) -> Iterator[os.DirEntry]:
+    """Percorre ``root`` com ``os.scandir`` e devolve as entradas que são ficheiros.
 
-def _walk_dir(root: Path, log_cb: Callable[[str], None] | None = None):
-    # Caminha recursivamente, ignora erros ao entrar em subpastas
-    stack = [root]
+    Cada pasta é listada uma única vez: o tipo vem do ``d_type`` da própria
+    entrada (sem ``stat`` extra na maioria dos sistemas de ficheiros) e serve
+    tanto para decidir a recursão como para filtrar ficheiros.
+    """
+    # Caminha em profundidade, ignora erros ao entrar em subpastas
+    stack = [os.fspath(root)]
     while stack:
         curr = stack.pop()
         try:
-            yield curr
-            for entry in curr.iterdir():
-                if entry.is_dir():
-                    stack.append(entry)
+            with os.scandir(curr) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.is_file():
+                            yield entry
+                    except Exception as e:
+                        _warn(log_cb, f"⚠️  Erro ao processar {entry.path}: {e}")
         except Exception as e:
-            msg = f"⚠️  Erro ao entrar em {curr}: {e}"
-            if log_cb:
-                log_cb(msg)
-            else:
-                print(msg)
-
-
-def _scan_dir(src: Path, exts, archives, arch_exts, log_cb: Callable[[str], None] | None = None):
-    try:
-        for entry in src.iterdir():
-            try:
-                if entry.is_file():
-                    suf = entry.suffix.lower()
-                    if suf.lstrip(".") in exts:
-                        yield entry
-                    elif archives and suf in arch_exts:
-                        yield entry
-            except Exception as e:
-                msg = f"⚠️  Erro ao processar {entry}: {e}"
-                if log_cb:
-                    log_cb(msg)
-                else:
-                    print(msg)
-    except Exception as e:
-        msg = f"⚠️  Erro ao listar {src}: {e}"
-        if log_cb:
-            log_cb(msg)
-        else:
-            print(msg)
+            _warn(log_cb, f"⚠️  Erro ao listar {curr}: {e}")
@@ -78,7 +78,7 @@ from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QApplication, QCheckBox, QComboBox, QDialog, QFileDialog, QGridLayout, QGroupBox,
     QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem, QMainWindow,
-    QMessageBox, QPushButton, QProgressBar, QSizePolicy, QTextEdit, QTreeWidget,
+    QMessageBox, QPushButton, QProgressBar, QSizePolicy, QSpinBox, QTextEdit, QTreeWidget,
     QTreeWidgetItem, QVBoxLayout, QWidget
 )
 
@@ -94,9 +94,10 @@ class Worker(QObject):
     log      = Signal(str)
     finished = Signal(dict)       # stats no fim
 
-    def __init__(self, cfg: Dict, parent=None):
+    def __init__(self, cfg: Dict, governor=None, parent=None):
         super().__init__(parent)
         self.cfg = cfg
+        self.governor = governor  # limites ajustáveis durante a cópia
         self._stop = False
 
     def cancel(self):
@@ -105,55 +106,22 @@ class Worker(QObject):
     def run(self):
         """Executa num QThread."""
         from src.core.copier import copy_selected  # import tardio para arrancar mais depressa
-        from src.core.scanner import scan
-        from src.core.extractor import iterate_archive, is_archive
         from datetime import datetime
-        from pathlib import Path
 
         stats = {}
         start = datetime.now()
         self.log.emit(f"🕒 Início: {start.strftime('%Y-%m-%d %H:%M:%S')}")
         try:
-            # pré-scan para determinar o total de itens
-            base_src = Path(self.cfg["src"])
-            total = 0
-            for path in scan(
-                root=base_src,
-                extensions=self.cfg["extensions"],
-                recursive=self.cfg.get("recursive", True),
-                log_cb=None,
-            ):
-                if self._stop:
-                    break
-                total += 1
-
-            if self.cfg.get("include_archives") and not self._stop:
-                for arc in scan(
-                    root=base_src,
-                    extensions=self.cfg.get("archive_types", set()),
-                    recursive=self.cfg.get("recursive", True),
-                    log_cb=None,
-                ):
-                    if self._stop:
-                        break
-                    if not is_archive(arc, self.cfg.get("archive_types")):
-                        continue
-                    try:
-                        for _ in iterate_archive(arc, self.cfg["extensions"]):
-                            total += 1
-                    except Exception:
-                        continue
-
-            self.total.emit(total)
-
-            if not self._stop:
-                copy_selected(
-                    **self.cfg,
-                    progress_cb=self.progress.emit,
-                    log_cb=self.log.emit,
-                    stop_flag=lambda: self._stop,
-                    stats=stats,
-                )
+            # sem pré-scan: o total cresce à medida que o scan da cópia avança
+            copy_selected(
+                **self.cfg,
+                progress_cb=self.progress.emit,
+                total_cb=self.total.emit,
+                log_cb=self.log.emit,
+                stop_flag=lambda: self._stop,
+                stats=stats,
+                governor=self.governor,
+            )
         except Exception as e:
             self.log.emit(f"❌ Erro: {e}")
         finally:
@@ -180,6 +148,7 @@ class MainWindow(QMainWindow):
 
         self._thread: QThread | None = None
         self._worker: Worker | None = None
+        self._governor = None
         self.dst: str | None = None
         self.log_file: Path | None = None
         self._stats: Dict | None = None
@@ -258,6 +227,16 @@ class MainWindow(QMainWindow):
         self._populate_tree()
         self.tree.itemChanged.connect(self._on_tree_item_changed)
 
+        # limites de recursos (ajustáveis durante a cópia)
+        grid.addWidget(QLabel("Limite (MB/s):"), row, 0)
+        self.spin_limit = QSpinBox(self)
+        self.spin_limit.setRange(0, 10000)
+        self.spin_limit.setSpecialValueText("sem limite")
+        self.spin_limit.valueChanged.connect(self._on_limit_changed)
+        self.chk_low_prio = QCheckBox("Prioridade baixa (CPU e disco, só Linux)")
+        grid.addWidget(self.spin_limit, row, 1)
+        grid.addWidget(self.chk_low_prio, row, 2); row += 1
+
         # barra progresso + log
         self.progress = QProgressBar(self); self.progress.setValue(0)
         self.progress.setFixedHeight(30)
@@ -411,6 +390,8 @@ class MainWindow(QMainWindow):
             include_archives=self.chk_archives.isChecked(),
             archive_types=self._archive_types(),
             use_vss=use_vss,
+            hash_cache=True,  # reexecuções para o mesmo destino não voltam a ler tudo
+            resume=True,  # um backup interrompido continua onde ficou
         )
 
         self.dst = cfg["dst"]
@@ -420,15 +401,22 @@ class MainWindow(QMainWindow):
         self._save_session(cfg)
         self._start_time = datetime.now()
         self.time_label.setText("Tempo total previsto: --:--:--\nTempo restante: --:--:--")
+        self.progress.setMaximum(0)  # indeterminado até chegar o primeiro total
         self.progress.setValue(0)
         self.log.clear()
         self.btn_start.setEnabled(False)
         self.btn_cancel.setEnabled(True)
         self._stats = None
 
+        from src.core.governor import Governor
+        low = self.chk_low_prio.isChecked()
+        # sem limite os blocos de cópia continuam grandes (Governor.limited)
+        self._governor = Governor(nice=10 if low else None, ioprio="idle" if low else None)
+        self._on_limit_changed(self.spin_limit.value())
+
         # arranque da thread
         self._thread = QThread(self)
-        self._worker = Worker(cfg)
+        self._worker = Worker(cfg, self._governor)
         self._worker.moveToThread(self._thread)
         self._thread.started.connect(self._worker.run)
         self._worker.total.connect(self._on_total)
@@ -446,6 +434,12 @@ class MainWindow(QMainWindow):
             self._worker.cancel()
             self.btn_cancel.setEnabled(False)  # evita cliques múltiplos
 
+    def _on_limit_changed(self, mb_per_s: int):
+        # aplicado logo, mesmo a meio de uma cópia; 0 retira o limite
+        if self._governor:
+            bps = mb_per_s * 1024 * 1024 or None
+            self._governor.set_limits(read_bps=bps, write_bps=bps)
+
     def _on_total(self, total: int):
         self.progress.setMaximum(total)
 
@@ -526,6 +520,8 @@ class MainWindow(QMainWindow):
             custom=self.custom_edit.text().strip(),
             arch_types=list(self._archive_types()),
             exts=sorted(self._collect_extensions()),
+            limit_mb=self.spin_limit.value(),
+            low_prio=self.chk_low_prio.isChecked(),
         )
         try:
             SESSION_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
@@ -552,6 +548,8 @@ class MainWindow(QMainWindow):
         self.chk_vss.setChecked(bool(data.get("vss", False)))
         self.chk_archives.setChecked(bool(data.get("archives", True)))
         self.custom_edit.setText(data.get("custom", ""))
+        self.spin_limit.setValue(int(data.get("limit_mb", 0)))
+        self.chk_low_prio.setChecked(bool(data.get("low_prio", False)))
 
         # restaurar extensões marcadas
         want = set(data.get("exts", []))
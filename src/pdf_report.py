@@ -103,6 +103,7 @@ def gerar_relatorio_pdf(stats: Dict, destino: str | Path) -> Path:
     ext_counts = stats.get("ext_counts", {})
     ext_sizes = stats.get("ext_sizes", {})
     ext_arch = stats.get("ext_from_archives", {})
+    ext_ratios = (stats.get("compression") or {}).get("ext_ratios", {})
     if ext_counts:
         y -= 10
         c.setFont("Helvetica-Bold", 12)
@@ -114,6 +115,8 @@ def gerar_relatorio_pdf(stats: Dict, destino: str | Path) -> Path:
             size = _format_size(ext_sizes.get(ext, 0.0))
             arch = ext_arch.get(ext, 0)
             extra = f" [de compactados: {arch}]" if arch else ""
+            if ext in ext_ratios:
+                extra += f" [comprimido para {ext_ratios[ext]:.0%}]"
             c.drawString(60, y, f".{ext}: {count} ficheiros ({size}){extra}")
             y -= 20
             if y < 50:
@@ -1,4 +1,14 @@
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
 from src.core.copier import copy_selected
+from src.core.manifest import RunManifest
 
 
 def test_copy_selected_copies_only_requested(tmp_path):
@@ -11,6 +21,7 @@ def test_copy_selected_copies_only_requested(tmp_path):
     (sub / 'foto.jpg').write_text('img')
 
     progress = []
+    totals = []
     stats = {}
     copy_selected(
         src=src,
@@ -19,6 +30,7 @@ def test_copy_selected_copies_only_requested(tmp_path):
         recursive=True,
         preserve_structure=True,
         progress_cb=progress.append,
+        total_cb=totals.append,
         stats=stats,
     )
 
@@ -27,6 +39,7 @@ def test_copy_selected_copies_only_requested(tmp_path):
     assert not (dst / 'txt').exists()
     assert stats['files_copied'] == 1
     assert progress[-1] == 1
+    assert totals[-1] == 1
 
 
 def test_copy_skips_if_identical(tmp_path):
@@ -76,3 +89,706 @@ def test_copy_adds_if_different(tmp_path):
     assert (folder / 'foto.jpg').read_text() == 'old'
     assert (folder / 'foto_1.jpg').read_text() == 'new'
     assert stats['files_copied'] == 1
+
+
+def test_copy_total_grows_with_archive_headers(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    (src / 'foto.jpg').write_text('img')
+    with zipfile.ZipFile(src / 'fotos.zip', 'w') as z:
+        z.writestr('a.jpg', 'a')
+        z.writestr('b.jpg', 'b')
+        z.writestr('c.txt', 'c')
+
+    progress = []
+    totals = []
+    stats = {}
+    copy_selected(
+        src=src,
+        dst=dst,
+        extensions={'jpg'},
+        include_archives=True,
+        archive_types={'zip'},
+        progress_cb=progress.append,
+        total_cb=totals.append,
+        stats=stats,
+    )
+
+    assert totals == sorted(totals)
+    assert totals[-1] == progress[-1] == 3
+    assert stats['ext_from_archives'] == {'jpg': 2}
+
+
+def test_copy_extracts_compound_tar_suffixes(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    for name, mode in (('a.tar.gz', 'w:gz'), ('b.tbz2', 'w:bz2')):
+        with tarfile.open(src / name, mode) as t:
+            data = name.encode()
+            info = tarfile.TarInfo(f'{name[0]}.jpg')
+            info.size = len(data)
+            t.addfile(info, io.BytesIO(data))
+
+    stats = {}
+    copy_selected(
+        src=src,
+        dst=dst,
+        extensions={'jpg'},
+        include_archives=True,
+        archive_types={'tar'},
+        stats=stats,
+    )
+
+    assert (dst / 'jpg' / 'a.jpg').read_bytes() == b'a.tar.gz'
+    assert (dst / 'jpg' / 'b.jpg').read_bytes() == b'b.tbz2'
+    assert stats['ext_from_archives'] == {'jpg': 2}
+
+
+def test_parallel_copy_matches_serial_naming(tmp_path):
+    src = tmp_path / 'src'
+    for i in range(30):
+        d = src / f'd{i}'
+        d.mkdir(parents=True)
+        (d / 'IMG_0001.jpg').write_text(f'foto {i}')
+        (d / 'IMG_0001_1.jpg').write_text(f'outra {i}')
+    (src / 'd0' / 'igual.jpg').write_text('same')
+    (src / 'd1' / 'igual.jpg').write_text('same')
+
+    def run(dst, workers):
+        stats = {}
+        progress = []
+        copy_selected(
+            src=src,
+            dst=dst,
+            extensions={'jpg'},
+            preserve_structure=False,
+            progress_cb=progress.append,
+            stats=stats,
+            workers=workers,
+        )
+        contents = {p.name: p.read_text() for p in (dst / 'jpg').iterdir()}
+        return contents, stats, progress
+
+    serial, serial_stats, _ = run(tmp_path / 'serial', 1)
+    parallel, parallel_stats, progress = run(tmp_path / 'parallel', 4)
+
+    assert parallel == serial
+    assert len(serial) == 61
+    assert parallel_stats['files_copied'] == serial_stats['files_copied'] == 61
+    assert progress == list(range(1, 63))
+
+
+def test_copy_reports_strategy_and_keeps_metadata(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    original = src / 'foto.jpg'
+    original.write_bytes(b'x' * 5000)
+    os.utime(original, ns=(1_000_000_000, 1_000_000_000))
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, stats=stats)
+
+    copied = dst / 'jpg' / 'foto.jpg'
+    assert copied.read_bytes() == original.read_bytes()
+    assert copied.stat().st_mtime_ns == 1_000_000_000
+    assert not os.path.samefile(copied, original)
+    [(strategy, entry)] = stats['copy_strategies'].items()
+    assert strategy != 'hardlink'
+    assert entry == {'files': 1, 'bytes': 5000}
+
+
+def test_copy_hardlinks_on_same_filesystem(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    (src / 'foto.jpg').write_text('img')
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, stats=stats, allow_hardlinks=True)
+
+    assert os.path.samefile(dst / 'jpg' / 'foto.jpg', src / 'foto.jpg')
+    assert stats['copy_strategies'] == {'hardlink': {'files': 1, 'bytes': 3}}
+
+
+@pytest.mark.parametrize('level', ['none', 'per-file', 'batched', 'end-of-run'])
+def test_copy_durability_levels(tmp_path, level):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    for i in range(5):
+        (src / f'f{i}.jpg').write_text(str(i))
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, stats=stats, durability=level)
+
+    assert sorted(p.read_text() for p in (dst / 'jpg').iterdir()) == ['0', '1', '2', '3', '4']
+    info = stats['durability']
+    assert info['level'] == level
+    if level == 'none':
+        assert info == {'level': 'none', 'fsyncs': 0, 'checkpoints': 0}
+    elif level == 'per-file':
+        assert info['fsyncs'] == 5
+    else:
+        assert info['checkpoints'] == 1
+
+
+def test_copy_rejects_unknown_durability(tmp_path):
+    with pytest.raises(ValueError):
+        copy_selected(src=tmp_path, dst=tmp_path / 'dst', extensions={'jpg'}, durability='sempre')
+
+
+def test_copy_records_digest_in_run_manifest(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    (src / 'foto.jpg').write_bytes(b'img' * 1000)
+    with zipfile.ZipFile(src / 'fotos.zip', 'w') as z:
+        z.writestr('a.jpg', 'a')
+
+    stats = {}
+    copy_selected(
+        src=src,
+        dst=dst,
+        extensions={'jpg'},
+        include_archives=True,
+        archive_types={'zip'},
+        stats=stats,
+        hash_algo='blake2b',
+    )
+
+    entries = {e['src']: e for e in RunManifest.read(Path(stats['manifest']))}
+    assert set(entries) == {'foto.jpg', 'fotos.zip!a.jpg'}
+    foto = entries['foto.jpg']
+    assert foto['dst'] == 'jpg/foto.jpg'
+    assert foto['size'] == 3000
+    assert foto['digest'] == hashlib.blake2b(b'img' * 1000).hexdigest()
+    assert entries['fotos.zip!a.jpg']['digest'] == hashlib.blake2b(b'a').hexdigest()
+
+
+def test_hash_cache_avoids_rehashing_on_rerun(tmp_path, monkeypatch):
+    import src.core.copier as copier
+
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    src.mkdir()
+    (src / 'a.jpg').write_text('a')
+    (src / 'b.jpg').write_text('b')
+
+    hashed = []
+    real_hash = copier.file_hash
+    monkeypatch.setattr(copier, 'file_hash', lambda p, *a: hashed.append(p) or real_hash(p, *a))
+
+    run = dict(src=src, dst=dst, extensions={'jpg'}, hash_cache=True)
+    copy_selected(**run, hash_algo='sha256')
+    assert hashed == []
+
+    stats = {}
+    copy_selected(**run, stats=stats)
+    assert hashed == []
+    assert stats['files_copied'] == 0
+    assert stats['hash_cache']['hits'] == 4
+
+    assert stats['compare']['tiers'] == {'digest': 2}
+
+    # origem alterada (mesmo tamanho): entrada expirada, volta a ler só esse ficheiro
+    (src / 'a.jpg').write_text('z')
+    os.utime(src / 'a.jpg', ns=(1, 1))
+    stats = {}
+    copy_selected(**run, stats=stats)
+    assert hashed == [src / 'a.jpg']
+    assert stats['hash_cache']['evicted'] == 1
+    assert (dst / 'jpg' / 'a_1.jpg').read_text() == 'z'
+
+
+def test_compare_tiers_decide_without_full_reads(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    (dst / 'bin').mkdir(parents=True)
+    src.mkdir()
+    big = os.urandom(8 * 1024 * 1024)
+    (src / 'tamanho.bin').write_bytes(b'abc')
+    (dst / 'bin' / 'tamanho.bin').write_bytes(b'abcd')
+    (src / 'grande.bin').write_bytes(big)
+    (dst / 'bin' / 'grande.bin').write_bytes(big[:-1] + bytes([big[-1] ^ 1]))
+    (src / 'igual.bin').write_bytes(b'same')
+    (dst / 'bin' / 'igual.bin').write_bytes(b'same')
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'bin'}, stats=stats)
+
+    cmp = stats['compare']
+    assert cmp['tiers'] == {'size': 1, 'sample': 1, 'lockstep': 1}
+    assert cmp['bytes_read'] < 1024 * 1024
+    assert stats['files_copied'] == 2
+
+
+def test_conflict_names_use_destination_index(tmp_path):
+    src = tmp_path / 'src'
+    dst = tmp_path / 'dst'
+    for i in range(3):
+        (src / f'd{i}').mkdir(parents=True)
+        (src / f'd{i}' / 'foto.jpg').write_text(f'nova {i}')
+    (dst / 'jpg').mkdir(parents=True)
+    (dst / 'jpg' / 'foto.jpg').write_text('antiga')
+    (dst / 'jpg' / 'foto_2.jpg').write_text('antiga 2')
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, preserve_structure=False, stats=stats)
+
+    names = sorted(p.name for p in (dst / 'jpg').iterdir())
+    assert names == ['foto.jpg', 'foto_1.jpg', 'foto_2.jpg', 'foto_3.jpg', 'foto_4.jpg']
+    assert (dst / 'jpg' / 'foto_2.jpg').read_text() == 'antiga 2'
+    assert stats['dest_dirs_indexed'] == 1
+
+
+def test_materialize_dirs_creates_skeleton_before_copy(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    for sub in ('a/b', 'a/c', 'd'):
+        (src / sub).mkdir(parents=True)
+        (src / sub / 'f.jpg').write_text(sub)
+        (src / sub / 'g.jpg').write_text(sub)
+    dst = tmp_path / 'dst'
+
+    events = []
+    real_mkdir = os.mkdir
+    monkeypatch.setattr(os, 'mkdir', lambda p, *a: events.append('mkdir') or real_mkdir(p, *a))
+
+    stats = {}
+    copy_selected(
+        src=src,
+        dst=dst,
+        extensions={'jpg'},
+        stats=stats,
+        total_cb=lambda n: events.append(('total', n)),
+        progress_cb=lambda n: events.append(('progress', n)),
+        materialize_dirs=True,
+        workers=2,
+    )
+
+    assert stats['files_copied'] == 6
+    # jpg, jpg/a, jpg/a/b, jpg/a/c, jpg/d — cada uma criada uma só vez
+    assert stats['dirs_created'] == 5
+    first_progress = next(i for i, e in enumerate(events) if e[0] == 'progress')
+    assert ('total', 6) in events[:first_progress]
+    assert 'mkdir' not in events[first_progress:]
+
+
+def test_blob_store_keeps_one_copy_of_identical_content(tmp_path):
+    src = tmp_path / 'src'
+    (src / 'a').mkdir(parents=True)
+    (src / 'b').mkdir()
+    (src / 'a' / 'x.jpg').write_bytes(b'mesma foto' * 1000)
+    (src / 'b' / 'y.jpg').write_bytes(b'mesma foto' * 1000)
+    (src / 'b' / 'z.jpg').write_bytes(b'outra')
+    dst = tmp_path / 'dst'
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, stats=stats, blob_store=True)
+
+    blobs = stats['blob_store']
+    assert blobs['blobs_new'] == 2 and blobs['blobs_reused'] == 1
+    assert blobs['bytes_saved'] == 10_000 and blobs['dedup_ratio'] > 1
+    x, y = dst / 'jpg' / 'a' / 'x.jpg', dst / 'jpg' / 'b' / 'y.jpg'
+    assert os.path.samefile(x, y)
+    assert x.read_bytes() == b'mesma foto' * 1000
+
+    # nova execução para outra árvore reutiliza os blobs já guardados
+    (src / 'c').mkdir()
+    (src / 'c' / 'w.jpg').write_bytes(b'outra')
+    stats = {}
+    copy_selected(src=src / 'c', dst=dst, extensions={'jpg'}, stats=stats, blob_store=True)
+    assert stats['blob_store']['blobs_new'] == 0
+    assert os.path.samefile(dst / 'jpg' / 'w.jpg', dst / 'jpg' / 'b' / 'z.jpg')
+
+
+def test_resume_skips_items_completed_before_interruption(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    for i in range(6):
+        (src / f'f{i}.jpg').write_text(f'foto {i}')
+    with zipfile.ZipFile(src / 'album.zip', 'w') as zf:
+        zf.writestr('z.jpg', 'dentro')
+        zf.writestr('y.pdf', 'documento')
+    dst = tmp_path / 'dst'
+
+    progress = []
+    copy_selected(
+        src=src,
+        dst=dst,
+        extensions={'jpg'},
+        include_archives=True,
+        archive_types={'zip'},
+        progress_cb=progress.append,
+        stop_flag=lambda: len(progress) >= 3,
+        resume=True,
+    )
+    done = sorted(p.name for p in (dst / 'jpg').iterdir())
+    assert len(done) == 3
+    first_mtimes = {n: (dst / 'jpg' / n).stat().st_mtime_ns for n in done}
+
+    stats = {}
+    copy_selected(
+        src=src, dst=dst, extensions={'jpg'}, include_archives=True, archive_types={'zip'},
+        stats=stats, resume=True,
+    )
+    assert stats['resume']['skipped'] == 3
+    assert stats['files_copied'] == 4  # 3 em falta + o membro do zip
+    assert stats['compare']['tiers'] == {}  # os concluídos nem são comparados
+    assert {n: (dst / 'jpg' / n).stat().st_mtime_ns for n in done} == first_mtimes
+    assert stats['resume']['journal_entries'] == 8  # 7 itens + marcador do zip
+
+    # execução completa seguinte: tudo concluído, incluindo o arquivo inteiro
+    stats = {}
+    copy_selected(
+        src=src, dst=dst, extensions={'jpg'}, include_archives=True, archive_types={'zip'},
+        stats=stats, resume=True, durability='batched',
+    )
+    assert stats['resume']['skipped'] == 7 and stats['files_copied'] == 0
+
+    # o arquivo inteiro só é saltado com as mesmas extensões e os membros no destino
+    copy_selected(src=src, dst=dst, extensions={'jpg', 'pdf'}, include_archives=True, archive_types={'zip'},
+                  resume=True)
+    assert (dst / 'pdf' / 'y.pdf').read_text() == 'documento'
+    (dst / 'jpg' / 'z.jpg').unlink()
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg', 'pdf'}, include_archives=True, archive_types={'zip'},
+                  stats=stats, resume=True)
+    assert (dst / 'jpg' / 'z.jpg').read_text() == 'dentro'
+    assert stats['files_copied'] == 1 and stats['resume']['skipped'] == 7
+
+    # outras opções de destino: o diário anterior não vale, tudo é escrito de novo
+    sub = src / 'sub'
+    sub.mkdir()
+    (sub / 'g.jpg').write_text('sub')
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, resume=True)
+    stats, logs = {}, []
+    copy_selected(
+        src=src, dst=dst, extensions={'jpg'}, stats=stats, log_cb=logs.append, resume=True, preserve_structure=False
+    )
+    assert stats['resume']['skipped'] == 0
+    assert any('diário de retoma recomeçado' in m for m in logs)
+    assert (dst / 'jpg' / 'g.jpg').read_text() == 'sub'
+
+
+def test_writes_go_through_temp_and_partials_are_swept(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'a.jpg').write_bytes(b'a' * 3_000_000)
+    (src / 'b.jpg').write_bytes(b'b' * 10)
+    dst = tmp_path / 'dst'
+    (dst / 'jpg').mkdir(parents=True)
+    # restos de uma execução interrompida
+    (dst / 'jpg' / '.a.jpg.0badf00d.part').write_bytes(b'a' * 100)
+
+    import src.core.copier as copier
+    real_copy = copier._CopyStrategies._copy_bytes
+
+    def failing_copy(self, fd_in, fd_out, *a):
+        if os.fstat(fd_in).st_size == 10:
+            raise OSError(5, 'I/O error')
+        return real_copy(self, fd_in, fd_out, *a)
+
+    monkeypatch.setattr(copier._CopyStrategies, '_copy_bytes', failing_copy)
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'jpg'}, stats=stats, preserve_structure=False)
+
+    assert stats['partials_swept'] == 1
+    # a.jpg completo com o nome final; b.jpg falhou e não deixa rasto
+    assert sorted(os.listdir(dst / 'jpg')) == ['a.jpg']
+    assert (dst / 'jpg' / 'a.jpg').read_bytes() == b'a' * 3_000_000
+
+
+def test_names_near_name_max_still_copy(tmp_path):
+    from src.core.atomic import is_partial, partial_path
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    long_name = 'é' * 123 + '.jpg'   # 250 bytes em UTF-8
+    (src / long_name).write_bytes(b'longo')
+    stats = {}
+    copy_selected(src=src, dst=tmp_path / 'dst', extensions={'jpg'}, stats=stats)
+    assert (tmp_path / 'dst' / 'jpg' / long_name).read_bytes() == b'longo'
+    tmp = partial_path(tmp_path / long_name)
+    assert len(os.fsencode(tmp.name)) <= 255 and is_partial(tmp.name)
+
+
+def test_io_policy_scales_buffer_and_copies_with_hints(tmp_path):
+    from src.core.iopolicy import MAX_BUF, MIN_BUF, IOPolicy
+
+    adaptive = IOPolicy('adaptive')
+    assert adaptive.size_for(10) == MIN_BUF
+    assert MIN_BUF < adaptive.size_for(16 * 1024 * 1024) < MAX_BUF
+    assert adaptive.size_for(50 * 1024 ** 3) == MAX_BUF
+    assert IOPolicy('fixed').size_for(50 * 1024 ** 3) == 1024 * 1024
+    with pytest.raises(ValueError):
+        IOPolicy('enorme')
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    (src / 'video.mp4').write_bytes(data)
+    stats = {}
+    copy_selected(src=src, dst=tmp_path / 'dst', extensions={'mp4'}, stats=stats, hash_algo='sha256')
+    digest = next(RunManifest.read(Path(stats['manifest'])))['digest']
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / 'dst' / 'mp4' / 'video.mp4').read_bytes() == data
+
+
+def test_large_files_copied_by_parallel_ranges(tmp_path, monkeypatch):
+    import src.core.copier as copier
+    from src.core.hasher import file_range_hash, range_algo
+
+    monkeypatch.setattr(copier, '_RANGE_SIZE', 1024 * 1024)
+    src = tmp_path / 'src'
+    src.mkdir()
+    data = os.urandom(5 * 1024 * 1024 + 123)
+    (src / 'vm.img').write_bytes(data)
+    (src / 'small.img').write_bytes(b'pequeno')
+
+    for hash_algo in (None, 'sha256'):
+        dst = tmp_path / f'dst_{hash_algo}'
+        stats = {}
+        copy_selected(
+            src=src, dst=dst, extensions={'img'}, stats=stats, hash_algo=hash_algo,
+            range_workers=3, range_threshold=2 * 1024 * 1024,
+        )
+        assert (dst / 'img' / 'vm.img').read_bytes() == data
+        assert (dst / 'img' / 'small.img').read_bytes() == b'pequeno'
+        assert set(stats['copy_strategies']) & {'ranges', 'reflink'}
+
+    entries = {e['dst']: e for e in RunManifest.read(Path(stats['manifest']))}
+    big = entries['img/vm.img']
+    assert big['algo'] == range_algo('sha256', 1024 * 1024)
+    assert big['digest'] == file_range_hash(src / 'vm.img', 'sha256', 1024 * 1024)
+    assert entries['img/small.img']['algo'] == 'sha256'
+
+
+@pytest.mark.parametrize('fmt', ['zip', 'zip-deflate', 'tar'])
+def test_small_files_packed_into_indexed_segments(tmp_path, fmt):
+    from src.core.packer import PackIndex
+
+    src = tmp_path / 'src'
+    (src / 'app').mkdir(parents=True)
+    for i in range(20):
+        (src / 'app' / f'm{i}.py').write_text(f'print({i})\n' * 10)
+    (src / 'grande.py').write_bytes(b'#' * 200_000)
+    dst = tmp_path / 'dst'
+
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'py'}, stats=stats, pack_small=fmt, pack_threshold=64 * 1024)
+
+    assert stats['packs']['files'] == 20 and stats['packs']['segments'] == 1
+    assert (dst / 'py' / 'grande.py').exists()  # acima do limiar: árvore normal
+    assert not (dst / 'py' / 'app').exists()
+    index = PackIndex(dst)
+    assert len(list(index.list('py/app/'))) == 20
+    assert index.read('py/app/m7.py') == b'print(7)\n' * 10
+    index.restore('py/app/m3.py', tmp_path / 'restored.py')
+    assert (tmp_path / 'restored.py').read_text() == 'print(3)\n' * 10
+    segment = dst / 'packs' / index.lookup('py/app/m7.py').segment
+    if fmt == 'tar':
+        with tarfile.open(segment) as tf:
+            assert len(tf.getnames()) == 20
+    else:
+        with zipfile.ZipFile(segment) as zf:
+            assert zf.read('py/app/m7.py') == b'print(7)\n' * 10
+    index.close()
+
+    # nova execução: iguais não voltam a ser escritos; conteúdo novo ganha sufixo
+    (src / 'app' / 'm0.py').write_text('alterado')
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'py'}, stats=stats, pack_small=fmt, pack_threshold=64 * 1024)
+    assert stats['packs']['files'] == 1
+    index = PackIndex(dst)
+    assert index.read('py/app/m0_1.py') == b'alterado'
+    index.close()
+
+
+def test_compression_by_type_and_probe(tmp_path, monkeypatch):
+    import gzip
+
+    from src.core import compress
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    text = b'public class Foo { int x = 42; }\n' * 2000
+    noise = os.urandom(100_000)
+    (src / 'Foo.cs').write_bytes(text)
+    (src / 'dados.bin').write_bytes(noise)      # amostra não comprime
+    (src / 'foto.jpg').write_bytes(text)        # tipo já comprimido: nem é testado
+    dst = tmp_path / 'dst'
+    # o pool nasce com as threads de cópia a correr: nunca por fork
+    methods = []
+    real_pool = compress.ProcessPoolExecutor
+    monkeypatch.setattr(compress, 'ProcessPoolExecutor', lambda *a, **kw: methods.append(
+        kw['mp_context'].get_start_method()) or real_pool(*a, **kw))
+
+    stats = {}
+    copy_selected(
+        src=src, dst=dst, extensions={'cs', 'bin', 'jpg'}, stats=stats,
+        compress='zlib', compress_workers=2, hash_algo='sha256',
+    )
+    assert methods and 'fork' not in methods
+
+    assert gzip.decompress((dst / 'cs' / 'Foo.cs.gz').read_bytes()) == text
+    assert (dst / 'bin' / 'dados.bin').read_bytes() == noise
+    assert (dst / 'jpg' / 'foto.jpg').read_bytes() == text
+    comp = stats['compression']
+    assert comp['files'] == 1 and comp['skipped'] == 2
+    assert comp['ext_ratios']['cs'] < 0.1
+    assert stats['ext_sizes']['cs'] == pytest.approx(len(text) / 1024 / 1024)
+    entry = next(e for e in RunManifest.read(Path(stats['manifest'])) if e['dst'] == 'cs/Foo.cs.gz')
+    assert entry['digest'] == hashlib.sha256(text).hexdigest()
+
+    # reexecução: o comprimido é reconhecido como igual ao original
+    stats = {}
+    copy_selected(src=src, dst=dst, extensions={'cs'}, stats=stats, compress='zlib', compress_workers=2)
+    assert stats['files_copied'] == 0
+    assert stats['compare']['tiers'] == {'decompress': 1}
+
+
+def test_governor_throttles_and_limits_change_during_run(tmp_path):
+    from src.core.governor import Governor
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    for name in ('a.bin', 'b.bin'):
+        (src / name).write_bytes(os.urandom(3 * 1024 * 1024))
+    gov = Governor(write_bps=2 * 1024 * 1024)
+
+    def progress(done):
+        # a meio da execução, como a GUI: o limite deixa de existir
+        if done == 1:
+            gov.set_limits(write_bps=0)
+
+    stats = {}
+    copy_selected(src=src, dst=tmp_path / 'dst', extensions={'bin'}, stats=stats, governor=gov, progress_cb=progress)
+    assert stats['files_copied'] == 2
+    # só o primeiro ficheiro excede o balde inicial (1 MiB em dívida a 2 MiB/s)
+    assert 0.3 < stats['governor']['by_limit']['write'] < 2
+    assert stats['governor']['limits']['write_bps'] is None
+
+    with pytest.raises(ValueError):
+        Governor(ioprio='urgente').apply_priority()
+
+    # sem limites (como a GUI por omissão) os blocos de cópia não encolhem
+    from src.core.copier import _CopyStrategies
+    free = _CopyStrategies(None, governor=Governor())._chunk()
+    assert free > _CopyStrategies(None, governor=Governor(write_bps=1))._chunk()
+    assert _CopyStrategies(None, governor=gov)._chunk() == free  # limite retirado a meio
+
+
+def test_archives_in_process_pool_match_serial(tmp_path, monkeypatch):
+    from src.core import copier
+
+    src = tmp_path / 'src'
+    for i, folder in enumerate(('a', 'b', 'c')):
+        (src / folder).mkdir(parents=True)
+        with zipfile.ZipFile(src / folder / 'fotos.zip', 'w', compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr('x.jpg', f'x{i}' * 100)
+            z.writestr('sub/y.png', f'y{i}')
+            z.writestr('nota.txt', 'ignorar')
+        with tarfile.open(src / folder / 'mais.tar.gz', 'w:gz') as t:
+            data = f'z{i}'.encode()
+            info = tarfile.TarInfo('z.jpg')
+            info.size = len(data)
+            t.addfile(info, io.BytesIO(data))
+
+    methods = []
+    real_pool = copier.ProcessPoolExecutor
+    monkeypatch.setattr(copier, 'ProcessPoolExecutor', lambda *a, **kw: methods.append(
+        kw['mp_context'].get_start_method()) or real_pool(*a, **kw))
+    results = {}
+    for workers in (1, 3):
+        dst = tmp_path / f'dst{workers}'
+        stats, logs = {}, []
+        kwargs = dict(
+            src=src, dst=dst, extensions={'jpg', 'png'}, include_archives=True, archive_types={'zip', 'tar'},
+            hash_algo='sha256', resume=True, secure_logging=False, archive_workers=workers,
+        )
+        copy_selected(**kwargs, stats=stats, log_cb=logs.append)
+        tree = {p.relative_to(dst).as_posix(): p.read_bytes() for p in sorted(dst.rglob('*.*')) if p.suffix in ('.jpg', '.png')}
+        digests = sorted((r['src'], r['digest']) for r in RunManifest.read(Path(stats['manifest'])))
+        results[workers] = (tree, digests, stats['ext_from_archives'], stats['files_copied'],
+                            [m.replace(str(dst), 'DST') for m in logs if m.startswith('✔')])
+
+        # a retoma também vê o que os processos extraíram
+        again = {}
+        copy_selected(**kwargs, stats=again)
+        assert again['files_copied'] == 0
+        assert again['resume']['skipped'] == 9
+
+    assert results[1] == results[3]
+    assert results[3][2] == {'jpg': 6, 'png': 3}
+    assert methods and 'fork' not in methods
+
+
+def test_archive_pool_keeps_shared_destination_folders_in_one_process(tmp_path):
+    import shutil
+    from types import SimpleNamespace
+
+    from src.core.copier import _archive_groups
+
+    src = tmp_path / 'src'
+    for folder in ('a', 'a/b', 'c', 'd'):
+        (src / folder).mkdir(parents=True)
+        with zipfile.ZipFile(src / folder / 'fotos.zip', 'w') as z:
+            for i in range(4):
+                z.writestr(f'big{i}.jpg', folder.encode() * 200_000)
+    recs = [SimpleNamespace(path=p) for p in sorted(src.rglob('*.zip'), key=lambda p: (len(p.parts), p))]
+    # a e a/b escrevem em jpg/a/b/...: mesmo processo
+    assert [[r.path.parent.name for r in g] for g in _archive_groups(recs, src, True)] == [['a', 'b'], ['c'], ['d']]
+    assert len(_archive_groups(recs, src, False)) == 1
+
+    # um .part antigo é limpo, sem apagar as escritas em curso dos processos
+    (tmp_path / 'dst4' / 'jpg' / 'c').mkdir(parents=True)
+    (tmp_path / 'dst4' / 'jpg' / 'c' / '.big0.jpg.0123abcd.part').write_bytes(b'velho')
+    for preserve in (True, False):
+        results = {}
+        for workers in (1, 4):
+            dst = tmp_path / f'dst{workers}'
+            stats, logs = {}, []
+            copy_selected(src, dst, {'jpg'}, include_archives=True, archive_types={'zip'}, preserve_structure=preserve,
+                          secure_logging=False, archive_workers=workers, stats=stats, log_cb=logs.append)
+            assert not [m for m in logs if m.startswith(('❌', '⚠️'))]
+            assert not list(dst.rglob('*.part'))
+            results[workers] = {p.relative_to(dst).as_posix(): p.read_bytes() for p in dst.rglob('*.jpg')}
+            shutil.rmtree(dst)
+        assert results[1] == results[4]
+        assert len(results[4]) == (4 if not preserve else 16)
+
+
+def test_durability_fsyncs_writable_descriptors_without_syncfs(tmp_path, monkeypatch):
+    import fcntl
+
+    from src.core import copier, durability
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    for name in ('a.jpg', 'b.jpg'):
+        (src / name).write_bytes(b'x' * 100)
+    os.chmod(src / 'b.jpg', 0o444)  # atributo só de leitura, copiado pelo copystat
+    synced = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        # FlushFileBuffers em Windows falha com um descritor só de leitura
+        assert fcntl.fcntl(fd, fcntl.F_GETFL) & os.O_ACCMODE != os.O_RDONLY
+        synced.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(durability.os, 'fsync', fsync)
+    monkeypatch.setattr(durability, '_load_syncfs', lambda: None)
+    # a via de Windows: cópia pelo SO e nenhum descritor duplicado
+    monkeypatch.setattr(copier, '_NATIVE_COPY', True)
+    monkeypatch.setattr(durability, '_DUP_FDS', False)
+    for level in ('per-file', 'batched', 'end-of-run'):
+        stats = {}
+        copy_selected(src=src, dst=tmp_path / level, extensions={'jpg'}, durability=level, stats=stats)
+        assert stats['copy_strategies']['copy2']['files'] == 2
+        assert stats['durability']['fsyncs'] == 2, level
+        assert (tmp_path / level / 'jpg' / 'b.jpg').stat().st_mode & 0o777 == 0o444
+    assert len(synced) == 6
@@ -1,7 +1,8 @@
 from pathlib import Path
+import tarfile
 import zipfile
 
-from src.core.extractor import is_archive, iterate_archive
+from src.core.extractor import count_archive_members, is_archive, iterate_archive
 
 
 def test_is_archive_detects_zip():
@@ -20,3 +21,205 @@ def test_iterate_archive_reads_files(tmp_path):
     nome, bio = items[0]
     assert nome == 'a.jpg'
     assert bio.read() == b'abc'
+
+
+def test_count_archive_members_reads_headers_only(tmp_path):
+    zip_path = tmp_path / 'dados.zip'
+    with zipfile.ZipFile(zip_path, 'w') as z:
+        z.writestr('a.jpg', 'abc')
+        z.writestr('sub/b.JPG', 'def')
+        z.writestr('c.txt', 'xyz')
+    assert count_archive_members(zip_path, ['jpg']) == 2
+
+    # tar comprimido: contar obrigaria a descomprimir tudo
+    tgz_path = tmp_path / 'dados.tgz'
+    with tarfile.open(tgz_path, 'w:gz') as t:
+        t.add(zip_path, arcname='dados.zip')
+    assert count_archive_members(tgz_path, ['zip']) is None
+
+    tar_path = tmp_path / 'dados.tar'
+    with tarfile.open(tar_path, 'w') as t:
+        t.add(zip_path, arcname='a.zip')
+        t.add(zip_path, arcname='sub/b.zip')
+        t.add(tgz_path, arcname='c.tgz')
+    assert count_archive_members(tar_path, ['zip']) == 2
+
+
+def test_count_archive_members_skips_rar_symlinks(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    class Info:
+        def __init__(self, filename, link=False):
+            self.filename, self._link = filename, link
+
+        def isdir(self):
+            return False
+
+        def is_symlink(self):
+            return self._link
+
+    class FakeRar:
+        # imita rarfile.RarFile: só os cabeçalhos
+        def __init__(self, path):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def infolist(self):
+            return [Info('a.jpg'), Info('b.jpg'), Info('link.jpg', link=True)]
+
+    monkeypatch.setitem(sys.modules, 'rarfile', types.SimpleNamespace(RarFile=FakeRar))
+    # o link não é extraído: o total tem de bater com o que iterate_archive entrega
+    assert count_archive_members(tmp_path / 'fotos.rar', ['jpg']) == 2
+
+
+def test_iterate_archive_spills_large_members_and_streams(tmp_path):
+    zip_path = tmp_path / 'grande.zip'
+    big = bytes(range(256)) * 4096  # 1 MiB
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr('video.mkv', big)
+        z.writestr('mini.mkv', b'ab')
+
+    spooled = dict(iterate_archive(zip_path, ['mkv'], buffer_size=64 * 1024))
+    # acima de buffer_size o membro vai para disco, não para a memória
+    assert spooled['video.mkv']._rolled
+    assert not spooled['mini.mkv']._rolled
+    assert spooled['video.mkv'].read() == big
+    assert spooled['video.mkv'].member_size == len(big)
+
+    for name, stream in iterate_archive(zip_path, ['mkv'], stream=True):
+        assert not hasattr(stream, 'getbuffer')
+        assert stream.read() == (big if name == 'video.mkv' else b'ab')
+
+
+def test_iterate_archive_reads_compressed_tar_sequentially(tmp_path):
+    import io
+
+    tgz_path = tmp_path / 'fotos.tar.gz'
+    with tarfile.open(tgz_path, 'w:gz') as t:
+        for i in range(5):
+            data = f'foto{i}'.encode() * 1000
+            info = tarfile.TarInfo(f'album/f{i}.jpg')
+            info.size = len(data)
+            t.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo('album/nota.txt')
+        info.size = 1
+        t.addfile(info, io.BytesIO(b'x'))
+
+    # por omissão os membros continuam legíveis depois de o gerador avançar
+    items = list(iterate_archive(tgz_path, ['jpg']))
+    assert [n for n, _ in items] == [f'album/f{i}.jpg' for i in range(5)]
+    assert [s.read() for _, s in items] == [f'foto{i}'.encode() * 1000 for i in range(5)]
+    for name, stream in iterate_archive(tgz_path, ['jpg'], stream=True):
+        assert stream.read(5) == b'foto' + name[-5].encode()
+
+
+def test_rar_batch_uses_one_backend_call(tmp_path, monkeypatch):
+    import io
+    import shutil
+    import subprocess
+
+    import pytest
+
+    from src.core import extractor
+
+    monkeypatch.setattr(extractor.shutil, 'which', lambda tool: None)
+    with pytest.raises(extractor.ArchiveBackendError):
+        list(extractor._extract_rar_batch(tmp_path / 'x.rar', {'a.jpg': ('a.jpg', 1)}, ['unrar'], False, 1024))
+    monkeypatch.undo()
+    if not shutil.which('bsdtar'):
+        pytest.skip('bsdtar não instalado')
+
+    # bsdtar também lê zip: serve para exercitar a extração em lote
+    zip_path = tmp_path / 'dados.zip'
+    with zipfile.ZipFile(zip_path, 'w') as z:
+        z.writestr('a.jpg', 'abc')
+        z.writestr('sub/b.jpg', 'def')
+        z.writestr('c.txt', 'xyz')
+    calls = []
+    real_run = subprocess.run
+    monkeypatch.setattr(extractor.subprocess, 'run', lambda *a, **kw: calls.append(a) or real_run(*a, **kw))
+    wanted = {'a.jpg': ('a.jpg', 3), 'sub/b.jpg': ('sub/b.jpg', 3)}
+    items = {n: s.read() for n, s in extractor._extract_rar_batch(zip_path, wanted, ['bsdtar'], False, 1024)}
+    assert items == {'a.jpg': b'abc', 'sub/b.jpg': b'def'}
+    assert len(calls) == 1
+
+    # nomes com curingas são literais; links simbólicos não são seguidos
+    secret = tmp_path / 'segredo.jpg'
+    secret.write_bytes(b'SECRET')
+    tar_path = tmp_path / 'dados.tar'
+    with tarfile.open(tar_path, 'w') as t:
+        for name, data in (('foto[1].jpg', b'um'), ('foto1.jpg', b'outro'), ('a*b.jpg', b'estrela')):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            t.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('link.jpg')
+        link.type, link.linkname = tarfile.SYMTYPE, str(secret)
+        t.addfile(link)
+    wanted = {n: (n, 0) for n in ('foto[1].jpg', 'a*b.jpg', 'link.jpg')}
+    items = {}
+    with pytest.raises(extractor.ArchiveBackendError, match='1 membro'):
+        for n, s in extractor._extract_rar_batch(tar_path, wanted, ['bsdtar'], False, 1024):
+            items[n] = s.read()
+    assert items == {'foto[1].jpg': b'um', 'a*b.jpg': b'estrela'}
+
+
+def test_7z_streams_wanted_members_in_one_call_and_skips_links(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    import pytest
+
+    from src.core.extractor import ArchiveBackendError
+
+    arch = tmp_path / 'fotos.7z'
+    arch.write_bytes(b'')
+    monkeypatch.setitem(sys.modules, 'py7zr', None)
+    with pytest.raises(ArchiveBackendError):
+        list(iterate_archive(arch, ['jpg']))
+
+    calls = []
+    big = bytes(range(256)) * 40_000   # vários blocos da fila
+
+    class Info:
+        def __init__(self, filename, is_symlink=False):
+            self.filename, self.is_directory, self.is_symlink = filename, False, is_symlink
+            self.uncompressed = 1
+
+    class FakeSevenZip:
+        # imita py7zr.SevenZipFile: list() e extract(targets=..., factory=...)
+        def __init__(self, fh, mode='r'):
+            assert not isinstance(fh, (str, Path))  # ficheiro aberto: extração numa só thread
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def list(self):
+            return [Info('a.jpg'), Info('sub/b.jpg'), Info('link.jpg', is_symlink=True), Info('c.txt')]
+
+        def extract(self, path=None, targets=None, factory=None):
+            calls.append(sorted(targets))
+            for name, data in (('a.jpg', big), ('sub/b.jpg', b'b')):
+                out = factory.create(name)
+                out.write(data)
+                out.close()
+
+    io_mod = types.SimpleNamespace(Py7zIO=object, WriterFactory=object)
+    monkeypatch.setitem(sys.modules, 'py7zr', types.SimpleNamespace(SevenZipFile=FakeSevenZip, io=io_mod))
+    monkeypatch.setitem(sys.modules, 'py7zr.io', io_mod)
+    for stream in (False, True):
+        items = {n: s.read() for n, s in iterate_archive(arch, ['jpg'], stream=stream)}
+        assert items == {'a.jpg': big, 'sub/b.jpg': b'b'}
+    assert calls == [['a.jpg', 'sub/b.jpg']] * 2
+    # quem deixa de ler a meio não fica à espera da thread de extração
+    gen = iterate_archive(arch, ['jpg'], stream=True)
+    assert next(gen)[1].read(3) == big[:3]
+    gen.close()
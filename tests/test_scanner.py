@@ -2,7 +2,7 @@ from pathlib import Path
 
 import pytest
 
-from src.core.scanner import scan
+from src.core.scanner import FileRecord, scan, scan_records
 
 
 def test_scan_recursive_filters(tmp_path):
@@ -24,3 +24,39 @@ def test_scan_missing_root():
 
     # Com treat_missing_as_warning=True não deve lançar erro
     assert list(scan(missing, extensions=['jpg'], treat_missing_as_warning=True)) == []
+
+
+def test_scan_non_recursive_ignores_subfolders(tmp_path):
+    (tmp_path / 'a.jpg').write_text('jpg')
+    sub = tmp_path / 'sub'
+    sub.mkdir()
+    (sub / 'b.jpg').write_text('jpg')
+    # pasta com nome de ficheiro pretendido não deve aparecer
+    (tmp_path / 'pasta.jpg').mkdir()
+
+    found = list(scan(tmp_path, extensions=['jpg'], recursive=False))
+    assert found == [tmp_path / 'a.jpg']
+
+
+def test_scan_records_carries_stat_fields(tmp_path):
+    f = tmp_path / 'a.jpg'
+    f.write_bytes(b'12345')
+    (tmp_path / 'b.txt').write_text('txt')
+
+    recs = list(scan_records(tmp_path, extensions=['jpg']))
+    assert len(recs) == 1
+    rec = recs[0]
+    assert isinstance(rec, FileRecord)
+    st = f.stat()
+    assert rec.path == f
+    assert rec.size == 5
+    assert rec.mtime_ns == st.st_mtime_ns
+    assert (rec.inode, rec.device) == (st.st_ino, st.st_dev)
+
+
+def test_scan_matches_compound_archive_suffixes(tmp_path):
+    for name in ('a.tar.gz', 'b.tgz', 'c.tar.bz2', 'd.gz', 'e.zip'):
+        (tmp_path / name).write_bytes(b'')
+
+    found = scan(tmp_path, extensions=[], archives=True, arch_types=['tar'])
+    assert sorted(p.name for p in found) == ['a.tar.gz', 'b.tgz', 'c.tar.bz2']